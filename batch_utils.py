@@ -0,0 +1,32 @@
+import json
+import os
+
+# the folders of a spool, jobs move from `pending` to `running` to `done`
+SPOOL_DIRS = ['pending', 'running', 'done']
+
+
+def make_spool(spool):
+    for spool_dir in SPOOL_DIRS:
+        os.makedirs(os.path.join(spool, spool_dir), exist_ok=True)
+
+
+def write_json(file_path, data):
+    # write to a temporary file first so nobody reads a half written result
+    with open(file_path + '.tmp', 'w') as json_file:
+        json.dump(data, json_file, indent=2)
+    os.replace(file_path + '.tmp', file_path)
+
+
+def reset_scene(startup_file):
+    '''Load `startup_file` (or the default scene) fresh for the next build, only works inside Blender'''
+    import bpy
+    from make_model import get_plugin
+    if startup_file:
+        bpy.ops.wm.open_mainfile(filepath=startup_file)
+    else:
+        bpy.ops.wm.read_homefile()
+    # loading a file frees the old data but not the plugin's own state
+    plugin = get_plugin()
+    plugin.cleanup.reset()
+    # none of the holders from earlier jobs are left, so their names can be used again
+    plugin.holder.Holder.class_counter = 0
@@ -0,0 +1,115 @@
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from astropy.io import fits
+from astropy import wcs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from make_images import make_images  # noqa: E402
+import compare  # noqa: E402
+
+RESOLUTIONS = [512, 1024, 2048]
+QUICK_RESOLUTIONS = [512]
+FILTERS = 'gri'
+
+
+def synthetic_band(resolution, band_index, seed=0):
+    '''A spiral galaxy with sky noise, slightly different in each band'''
+    rng = np.random.default_rng(seed + band_index)
+    y, x = np.mgrid[-1:1:resolution * 1j, -1:1:resolution * 1j]
+    r = np.hypot(x, y)
+    theta = np.arctan2(y, x)
+    scale = 0.25 + 0.05 * band_index
+    image = 100 * np.exp(-r / scale) * (1 + 0.5 * np.cos(2 * (theta - 4 * r)))
+    image += rng.normal(0, 1, size=image.shape)
+    return image.astype(np.float32)
+
+
+def write_fits(base, resolution):
+    for band_index, filt in enumerate(FILTERS):
+        w = wcs.WCS(naxis=2)
+        # shift each band by a fraction of a pixel so `reproject` has work to do
+        w.wcs.crpix = [0.5 * resolution + 0.3 * band_index, 0.5 * resolution - 0.2 * band_index]
+        w.wcs.cdelt = [-0.396 / 3600, 0.396 / 3600]
+        w.wcs.crval = [202.47, 47.19]
+        w.wcs.ctype = ['RA---TAN', 'DEC--TAN']
+        hdu = fits.PrimaryHDU(data=synthetic_band(resolution, band_index), header=w.to_header())
+        hdu.writeto('{0}-{1}.fits'.format(base, filt), overwrite=True)
+
+
+def run(quick=False):
+    resolutions = QUICK_RESOLUTIONS if quick else RESOLUTIONS
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for resolution in resolutions:
+            base = os.path.join(tmp_dir, 'bench_{0}'.format(resolution))
+            write_fits(base, resolution)
+            params = {'resolution': resolution}
+            tracemalloc.start()
+            start = time.perf_counter()
+            make_images(base, index_cut=resolution // 8, filters=FILTERS, a=0.1, stretch_type='asinh')
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            result = {
+                'id': 'make_images[resolution={0}]'.format(resolution),
+                'benchmark': 'make_images',
+                'params': params,
+                'time': elapsed,
+                'peak_memory_mb': peak / 1024**2
+            }
+            print('{0}: {1:.2f}s, {2:.1f} MB'.format(result['id'], result['time'], result['peak_memory_mb']))
+            results.append(result)
+    return {
+        'suite': 'images',
+        'platform': platform.platform(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Benchmark make_images.py on synthetic multi-band fits files'
+    )
+    parser.add_argument(
+        '-o',
+        '--output',
+        type=str,
+        default='benchmark_images.json',
+        help='the `.json` file the results are written to'
+    )
+    parser.add_argument(
+        '-b',
+        '--baseline',
+        type=str,
+        default=None,
+        help='a stored results `.json` file to check for regressions against'
+    )
+    parser.add_argument(
+        '-t',
+        '--threshold',
+        type=float,
+        default=0.2,
+        help='the fractional increase in time or memory that counts as a regression'
+    )
+    parser.add_argument(
+        '-q',
+        '--quick',
+        action='store_true',
+        help='only run the smallest benchmark'
+    )
+    args = parser.parse_args()
+    results = run(quick=args.quick)
+    with open(args.output, 'w') as output_file:
+        json.dump(results, output_file, indent=2)
+    n_regressions = 0
+    if args.baseline is not None:
+        n_regressions = compare.check_baseline(args.baseline, results, threshold=args.threshold)
+    sys.exit(1 if n_regressions > 0 else 0)
@@ -0,0 +1,385 @@
+import bpy
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import numpy as np
+from mathutils.bvhtree import BVHTree
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import compare  # noqa: E402
+
+PLANE_SIZE = 112
+EMBOSS_MATRIX = {
+    'resolution': [256, 1024],
+    'Fpu': [0.5, 1, 2],
+    'Spike_removal': [False, True],
+    'Name_plate': [False, True],
+    'External_edge': ['NONE', 'TOP']
+}
+QUICK_EMBOSS_MATRIX = {
+    'resolution': [256],
+    'Fpu': [1],
+    'Spike_removal': [False, True],
+    'Name_plate': [False, True],
+    'External_edge': ['NONE', 'TOP']
+}
+# the reference is the original level 2 SUBSURF smoothing, each other case is
+# compared to it for size and surface deviation
+SMOOTHING_CASES = [
+    {'Image_smoothing': 'NONE', 'Subsurf_levels': 2},
+    {'Image_smoothing': 'GAUSSIAN', 'Subsurf_levels': 1},
+    {'Image_smoothing': 'GAUSSIAN', 'Subsurf_levels': 0},
+    {'Image_smoothing': 'BILATERAL', 'Subsurf_levels': 1},
+    {'Image_smoothing': 'BILATERAL', 'Subsurf_levels': 0}
+]
+# the geometry nodes engine is timed against the modifiers (the reference) at high Fpu
+ENGINE_FPU = [2, 4]
+QUICK_ENGINE_FPU = [1]
+HOLDER_SLOTS = [5, 10, 20, 40]
+QUICK_HOLDER_SLOTS = [5, 10]
+
+
+def get_plugin():
+    # the add-on's package name depends on how it was installed (legacy add-on or extension)
+    for module_name, module in sys.modules.items():
+        if module_name.split('.')[-1] == 'tactile_universe_plugin':
+            return module
+    raise ImportError('The Tactile Universe plugin must be installed and enabled')
+
+
+def synthetic_heightmap(resolution, seed=0):
+    '''A spiral "galaxy" with noise and a few point sources, scaled to [0, 1]'''
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[-1:1:resolution * 1j, -1:1:resolution * 1j]
+    r = np.hypot(x, y)
+    theta = np.arctan2(y, x)
+    image = np.exp(-r / 0.3) * (1 + 0.5 * np.cos(2 * (theta - 4 * r)))
+    image += 0.02 * rng.standard_normal(image.shape)
+    for sx, sy in rng.uniform(-0.9, 0.9, size=(10, 2)):
+        image += 0.5 * np.exp(-((x - sx)**2 + (y - sy)**2) / (2 * (2 / resolution)**2))
+    image = np.clip(image / image.max(), 0, 1)
+    return image.astype(np.float32)
+
+
+def make_image(name, heightmap):
+    height, width = heightmap.shape
+    image = bpy.data.images.new(name, width=width, height=height)
+    # removed by `cleanup.reset` along with the data the plugin makes
+    image['tu_made'] = True
+    rgba = np.ones((height, width, 4), dtype=np.float32)
+    rgba[..., :3] = heightmap[..., None]
+    image.pixels.foreach_set(rgba.ravel())
+    return image
+
+
+def make_plane(name, size):
+    bpy.ops.mesh.primitive_plane_add(size=1)
+    plane = bpy.context.active_object
+    plane.name = name
+    plane.dimensions = (size, size, 0)
+    bpy.ops.object.transform_apply(location=False, rotation=False, scale=True)
+    plane.data['tu_made'] = True
+    return plane
+
+
+def reset_scene():
+    get_plugin().cleanup.reset(remove_objects=True)
+
+
+def view3d_override():
+    # the operators run without an override when there is no window (background Blender, `-b`)
+    if bpy.context.window is None:
+        return {}
+    for area in bpy.context.window.screen.areas:
+        if area.type == 'VIEW_3D':
+            for region in area.regions:
+                if region.type == 'WINDOW':
+                    return {
+                        'window': bpy.context.window,
+                        'screen': bpy.context.window.screen,
+                        'area': area,
+                        'region': region,
+                        'scene': bpy.context.scene
+                    }
+    return {}
+
+
+def scene_face_counts():
+    '''Number of faces and triangles in the evaluated scene (i.e. what would be exported)'''
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    faces = 0
+    triangles = 0
+    for obj in bpy.context.scene.objects:
+        if obj.type not in ('MESH', 'FONT'):
+            continue
+        obj_eval = obj.evaluated_get(depsgraph)
+        mesh = obj_eval.to_mesh()
+        mesh.calc_loop_triangles()
+        faces += len(mesh.polygons)
+        triangles += len(mesh.loop_triangles)
+        obj_eval.to_mesh_clear()
+    return faces, triangles
+
+
+def evaluated_surface(obj):
+    '''The vertices and a BVH tree of the evaluated (i.e. exported) mesh of `obj`'''
+    obj_eval = obj.evaluated_get(bpy.context.evaluated_depsgraph_get())
+    mesh = obj_eval.to_mesh()
+    vertices = [obj.matrix_world @ v.co for v in mesh.vertices]
+    polygons = [tuple(p.vertices) for p in mesh.polygons]
+    obj_eval.to_mesh_clear()
+    return vertices, BVHTree.FromPolygons(vertices, polygons)
+
+
+def one_way_deviation(vertices, tree):
+    distances = np.array([tree.find_nearest(v)[3] for v in vertices])
+    return distances.max(), (distances**2).mean()
+
+
+def deviation(surface, reference):
+    '''Symmetric max and RMS distance between two surfaces from `evaluated_surface`'''
+    max_a, ms_a = one_way_deviation(surface[0], reference[1])
+    max_b, ms_b = one_way_deviation(reference[0], surface[1])
+    return max(max_a, max_b), np.sqrt(0.5 * (ms_a + ms_b))
+
+
+def case_id(benchmark, params):
+    return '{0}[{1}]'.format(
+        benchmark,
+        ','.join('{0}={1}'.format(k, v) for k, v in params.items())
+    )
+
+
+def run_emboss(params, heightmaps, timing):
+    reset_scene()
+    name = 'bench_{0}'.format(params['resolution'])
+    make_image(name, heightmaps[params['resolution']])
+    plane = make_plane(name, PLANE_SIZE)
+    emboss_keywords = {k: v for k, v in params.items() if k != 'resolution'}
+    emboss_keywords['Name_plate_text'] = 'Benchmark'
+    timer = timing.StageTimer(name)
+    with timer.stage('case'):
+        bpy.ops.object.editmode_toggle()
+        with bpy.context.temp_override(**view3d_override()):
+            bpy.ops.object.emboss_plane(**emboss_keywords)
+        bpy.ops.object.editmode_toggle()
+        faces, triangles = scene_face_counts()
+    record = timer.stages[-1]
+    return {
+        'id': case_id('emboss_plane', params),
+        'benchmark': 'emboss_plane',
+        'params': params,
+        'time': record['time'],
+        'faces': faces,
+        'triangles': triangles,
+        'peak_memory_mb': record['peak_memory_mb'],
+        'memory_increase_mb': record['memory_increase_mb'],
+        'stages': json.loads(plane['TU_timing'])['stages']
+    }
+
+
+def run_smoothing(heightmap, timing):
+    '''Compare smoothing the image (with fewer SUBSURF levels) to the level 2 SUBSURF smoothing'''
+    mesh_budget = get_plugin().mesh_budget
+    results = []
+    reference = None
+    for index, case in enumerate(SMOOTHING_CASES):
+        params = dict(resolution=heightmap.shape[0], Fpu=1, **case)
+        result = run_emboss(params, {heightmap.shape[0]: heightmap}, timing)
+        result['id'] = case_id('smoothing', params)
+        result['benchmark'] = 'smoothing'
+        result['stl_mb'] = (mesh_budget.STL_HEADER_BYTES + mesh_budget.STL_TRIANGLE_BYTES * result['triangles']) / 1024**2
+        surface = evaluated_surface(bpy.data.objects['bench_{0}'.format(heightmap.shape[0])])
+        if index == 0:
+            reference = surface
+        else:
+            result['deviation_max_mm'], result['deviation_rms_mm'] = deviation(surface, reference)
+        results.append(result)
+    return results
+
+
+def run_engines(heightmap, fpus, timing):
+    '''Compare the time and surface of the geometry nodes engine to the modifiers at each Fpu'''
+    results = []
+    for fpu in fpus:
+        reference = None
+        for engine in ['MODIFIERS', 'GEOMETRY_NODES']:
+            params = {'resolution': heightmap.shape[0], 'Fpu': fpu, 'Engine': engine}
+            result = run_emboss(params, {heightmap.shape[0]: heightmap}, timing)
+            result['id'] = case_id('engine', params)
+            result['benchmark'] = 'engine'
+            surface = evaluated_surface(bpy.data.objects['bench_{0}'.format(heightmap.shape[0])])
+            if reference is None:
+                reference = surface
+            else:
+                result['deviation_max_mm'], result['deviation_rms_mm'] = deviation(surface, reference)
+            results.append(result)
+    return results
+
+
+def run_holder(number_slots, timing):
+    reset_scene()
+    params = {'Number_slots': number_slots}
+    timer = timing.StageTimer('holder')
+    with timer.stage('case'):
+        bpy.ops.object.holder(**params)
+        faces, triangles = scene_face_counts()
+    record = timer.stages[-1]
+    return {
+        'id': case_id('holder', params),
+        'benchmark': 'holder',
+        'params': params,
+        'time': record['time'],
+        'faces': faces,
+        'triangles': triangles,
+        'peak_memory_mb': record['peak_memory_mb']
+    }
+
+
+def run_soak(n_builds, heightmap, threshold_mb=50):
+    '''Build the same model `n_builds` times, checking that no datablocks are left over and memory stays flat'''
+    plugin = get_plugin()
+    params = {
+        'resolution': heightmap.shape[0],
+        'Fpu': 1,
+        'Spike_removal': True,
+        'Name_plate': True,
+        'External_edge': 'TOP'
+    }
+    counts = []
+    memory = []
+    for _ in range(n_builds):
+        run_emboss(params, {heightmap.shape[0]: heightmap}, plugin.timing)
+        reset_scene()
+        counts.append(plugin.cleanup.datablock_counts())
+        memory.append(plugin.timing.current_memory_mb())
+    problems = []
+    if any(c != counts[0] for c in counts):
+        problems.append('datablocks left over: {0} after the first build, {1} after the last'.format(counts[0], counts[-1]))
+    # the first few builds fill caches, so only look at the growth after that
+    start = min(10, n_builds - 1)
+    if (memory[0] is not None) and (memory[-1] - memory[start] > threshold_mb):
+        problems.append('memory grew by {0:.0f} MB from build {1} to build {2}'.format(
+            memory[-1] - memory[start],
+            start + 1,
+            n_builds
+        ))
+    for problem in problems:
+        print('SOAK FAILED: {0}'.format(problem))
+    if len(problems) == 0:
+        print('Soak passed: {0} builds, {1}'.format(
+            n_builds,
+            'memory not measured' if memory[0] is None else '{0:.0f} MB at the end'.format(memory[-1])
+        ))
+    return {
+        'suite': 'soak',
+        'n_builds': n_builds,
+        'datablocks': counts,
+        'memory_mb': memory,
+        'problems': problems
+    }
+
+
+def run(quick=False):
+    timing = get_plugin().timing
+    matrix = QUICK_EMBOSS_MATRIX if quick else EMBOSS_MATRIX
+    slots = QUICK_HOLDER_SLOTS if quick else HOLDER_SLOTS
+    engine_fpus = QUICK_ENGINE_FPU if quick else ENGINE_FPU
+    heightmaps = {r: synthetic_heightmap(r) for r in matrix['resolution']}
+    results = []
+    # smallest cases first so the peak memory grows with the size of the case
+    for values in itertools.product(*matrix.values()):
+        params = dict(zip(matrix.keys(), values))
+        result = run_emboss(params, heightmaps, timing)
+        print('{0}: {1:.2f}s, {2} faces'.format(result['id'], result['time'], result['faces']))
+        results.append(result)
+    for result in run_smoothing(heightmaps[matrix['resolution'][0]], timing):
+        print('{0}: {1:.2f}s, {2} triangles, {3:.1f} MB, deviation max {4:.3g} mm, rms {5:.3g} mm'.format(
+            result['id'],
+            result['time'],
+            result['triangles'],
+            result['stl_mb'],
+            result.get('deviation_max_mm', 0),
+            result.get('deviation_rms_mm', 0)
+        ))
+        results.append(result)
+    for result in run_engines(heightmaps[matrix['resolution'][-1]], engine_fpus, timing):
+        print('{0}: {1:.2f}s, {2} faces, deviation max {3:.3g} mm, rms {4:.3g} mm'.format(
+            result['id'],
+            result['time'],
+            result['faces'],
+            result.get('deviation_max_mm', 0),
+            result.get('deviation_rms_mm', 0)
+        ))
+        results.append(result)
+    for number_slots in slots:
+        result = run_holder(number_slots, timing)
+        print('{0}: {1:.2f}s, {2} faces'.format(result['id'], result['time'], result['faces']))
+        results.append(result)
+    reset_scene()
+    return {
+        'suite': 'plugin',
+        'blender_version': bpy.app.version_string,
+        'platform': platform.platform(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    parser = argparse.ArgumentParser(
+        prog='blender TU_startup.blend -b --python benchmarks/bench_plugin.py --',
+        description='Benchmark the Tactile Universe plugin on synthetic heightmaps'
+    )
+    parser.add_argument(
+        '-o',
+        '--output',
+        type=str,
+        default='benchmark_plugin.json',
+        help='the `.json` file the results are written to'
+    )
+    parser.add_argument(
+        '-b',
+        '--baseline',
+        type=str,
+        default=None,
+        help='a stored results `.json` file to check for regressions against'
+    )
+    parser.add_argument(
+        '-t',
+        '--threshold',
+        type=float,
+        default=0.2,
+        help='the fractional increase in time or memory that counts as a regression'
+    )
+    parser.add_argument(
+        '-q',
+        '--quick',
+        action='store_true',
+        help='only run a small subset of the benchmarks'
+    )
+    parser.add_argument(
+        '-s',
+        '--soak',
+        type=int,
+        default=0,
+        help='instead of the benchmarks, build the same model this many times and fail if memory or datablocks grow'
+    )
+    args = parser.parse_args(argv)
+    if args.soak > 0:
+        results = run_soak(args.soak, synthetic_heightmap(256))
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+        sys.exit(1 if len(results['problems']) > 0 else 0)
+    results = run(quick=args.quick)
+    with open(args.output, 'w') as output_file:
+        json.dump(results, output_file, indent=2)
+    n_regressions = 0
+    if args.baseline is not None:
+        n_regressions = compare.check_baseline(args.baseline, results, threshold=args.threshold)
+    sys.exit(1 if n_regressions > 0 else 0)
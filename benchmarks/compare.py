@@ -0,0 +1,82 @@
+import json
+
+# metrics where a larger value is a regression
+METRICS = ['time', 'peak_memory_mb']
+
+
+def load_results(file_path):
+    with open(file_path) as results_file:
+        results = json.load(results_file)
+    return {r['id']: r for r in results['results']}
+
+
+def compare_results(baseline, current, threshold=0.2):
+    '''Compare two sets of results (keyed by benchmark id) returning a list of regressions and a printable report'''
+    regressions = []
+    lines = []
+    for key, result in current.items():
+        if key not in baseline:
+            lines.append('NEW        {0}'.format(key))
+            continue
+        base = baseline[key]
+        status = 'OK'
+        details = []
+        for metric in METRICS:
+            old = base.get(metric)
+            new = result.get(metric)
+            if (old is None) or (new is None) or (old <= 0):
+                continue
+            ratio = new / old
+            details.append('{0} {1:.3g} -> {2:.3g} ({3:+.1%})'.format(metric, old, new, ratio - 1))
+            if ratio > 1 + threshold:
+                status = 'REGRESSION'
+                regressions.append((key, metric, old, new))
+        if base.get('faces') != result.get('faces'):
+            # a change in geometry is always flagged, faster or not
+            status = 'REGRESSION'
+            regressions.append((key, 'faces', base.get('faces'), result.get('faces')))
+            details.append('faces {0} -> {1}'.format(base.get('faces'), result.get('faces')))
+        lines.append('{0:<10} {1}: {2}'.format(status, key, ', '.join(details)))
+    for key in baseline:
+        if key not in current:
+            lines.append('MISSING    {0}'.format(key))
+    return regressions, '\n'.join(lines)
+
+
+def check_baseline(baseline_path, results, threshold=0.2):
+    '''Print a comparison against a stored baseline and return the number of regressions'''
+    baseline = load_results(baseline_path)
+    current = {r['id']: r for r in results['results']}
+    regressions, report = compare_results(baseline, current, threshold=threshold)
+    print(report)
+    print('{0} regression(s) against {1}'.format(len(regressions), baseline_path))
+    return len(regressions)
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Compare benchmark results with a stored baseline'
+    )
+    parser.add_argument(
+        'baseline',
+        type=str,
+        help='the baseline results `.json` file'
+    )
+    parser.add_argument(
+        'results',
+        type=str,
+        help='the new results `.json` file'
+    )
+    parser.add_argument(
+        '-t',
+        '--threshold',
+        type=float,
+        default=0.2,
+        help='the fractional increase in time or memory that counts as a regression'
+    )
+    args = parser.parse_args()
+    with open(args.results) as results_file:
+        results = json.load(results_file)
+    n_regressions = check_baseline(args.baseline, results, threshold=args.threshold)
+    raise SystemExit(1 if n_regressions > 0 else 0)
@@ -0,0 +1,307 @@
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    # use Blender's BVH tree when run inside Blender without scipy
+    cKDTree = None
+
+
+def read_stl(file_path):
+    '''The vertices and triangles of a binary or ASCII `.stl` file (each triangle has its own three vertices)'''
+    with open(file_path, 'rb') as stl_file:
+        data = stl_file.read()
+    n_triangles = np.frombuffer(data[80:84], dtype='<u4')[0] if len(data) >= 84 else 0
+    if (len(data) == 84 + 50 * n_triangles) and (n_triangles > 0):
+        facets = np.frombuffer(
+            data[84:],
+            dtype=[('normal', '<f4', (3,)), ('corners', '<f4', (3, 3)), ('attribute', '<u2')]
+        )
+        verts = facets['corners'].reshape(-1, 3).astype(np.float64)
+    else:
+        lines = data.decode('ascii', errors='ignore').split('\n')
+        verts = np.array([line.split()[1:4] for line in lines if line.strip().startswith('vertex')], dtype=np.float64)
+    return verts, np.arange(len(verts)).reshape(-1, 3)
+
+
+def read_ply(file_path):
+    '''The vertices and triangles of a binary little endian `.ply` file with float x, y, z and triangle faces
+    (as written by `make_model.py`)'''
+    with open(file_path, 'rb') as ply_file:
+        data = ply_file.read()
+    end = data.index(b'end_header\n') + len(b'end_header\n')
+    header = data[:end].decode('ascii').split('\n')
+    if 'format binary_little_endian 1.0' not in header:
+        raise ValueError('{0} is not a binary little endian PLY file'.format(file_path))
+    counts = {line.split()[1]: int(line.split()[2]) for line in header if line.startswith('element')}
+    n_verts = counts['vertex']
+    verts = np.frombuffer(data[end:end + 12 * n_verts], dtype='<f4').reshape(-1, 3).astype(np.float64)
+    faces = np.frombuffer(data[end + 12 * n_verts:], dtype=[('n', 'u1'), ('vertex_indices', '<i4', (3,))])
+    if np.any(faces['n'] != 3):
+        raise ValueError('{0} has faces that are not triangles'.format(file_path))
+    return verts, faces['vertex_indices'].astype(np.int64)
+
+
+def read_mesh(file_path):
+    if file_path.lower().endswith('.ply'):
+        return read_ply(file_path)
+    return read_stl(file_path)
+
+
+def triangle_areas(verts, tris):
+    corners = verts[tris]
+    return 0.5 * np.linalg.norm(np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]), axis=1)
+
+
+def signed_volume(verts, tris):
+    corners = verts[tris]
+    return np.einsum('ij,ij->i', corners[:, 0], np.cross(corners[:, 1], corners[:, 2])).sum() / 6
+
+
+def sample_surface(verts, tris, n_samples, seed=0):
+    '''Points spread evenly (by area) over the surface'''
+    rng = np.random.default_rng(seed)
+    areas = triangle_areas(verts, tris)
+    faces = rng.choice(len(tris), size=n_samples, p=areas / areas.sum())
+    r1 = np.sqrt(rng.random(n_samples))
+    r2 = rng.random(n_samples)
+    corners = verts[tris[faces]]
+    points = (
+        (1 - r1)[:, None] * corners[:, 0] +
+        (r1 * (1 - r2))[:, None] * corners[:, 1] +
+        (r1 * r2)[:, None] * corners[:, 2]
+    )
+    return points
+
+
+def point_triangle_distance(points, a, b, c):
+    '''Distance from each point to the closest point on the triangle (a, b, c) with the same index'''
+    ab = b - a
+    ac = c - a
+    ap = points - a
+    d1 = np.einsum('ij,ij->i', ab, ap)
+    d2 = np.einsum('ij,ij->i', ac, ap)
+    bp = points - b
+    d3 = np.einsum('ij,ij->i', ab, bp)
+    d4 = np.einsum('ij,ij->i', ac, bp)
+    cp = points - c
+    d5 = np.einsum('ij,ij->i', ab, cp)
+    d6 = np.einsum('ij,ij->i', ac, cp)
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # inside the triangle
+        denom = va + vb + vc
+        v = vb / denom
+        w = vc / denom
+        closest = a + v[:, None] * ab + w[:, None] * ac
+        # on an edge
+        edge_ab = (vc <= 0) & (d1 >= 0) & (d3 <= 0)
+        t = d1 / (d1 - d3)
+        closest[edge_ab] = (a + t[:, None] * ab)[edge_ab]
+        edge_ac = (vb <= 0) & (d2 >= 0) & (d6 <= 0)
+        t = d2 / (d2 - d6)
+        closest[edge_ac] = (a + t[:, None] * ac)[edge_ac]
+        edge_bc = (va <= 0) & ((d4 - d3) >= 0) & ((d5 - d6) >= 0)
+        t = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        closest[edge_bc] = (b + t[:, None] * (c - b))[edge_bc]
+    # at a corner
+    corner_a = (d1 <= 0) & (d2 <= 0)
+    closest[corner_a] = a[corner_a]
+    corner_b = (d3 >= 0) & (d4 <= d3)
+    closest[corner_b] = b[corner_b]
+    corner_c = (d6 >= 0) & (d5 <= d6)
+    closest[corner_c] = c[corner_c]
+    # degenerate triangles are measured to their first corner
+    closest[~np.isfinite(closest).all(axis=1)] = a[~np.isfinite(closest).all(axis=1)]
+    return np.linalg.norm(points - closest, axis=1)
+
+
+def split_triangles(corners, max_radius):
+    '''Cut triangles (corners (n, 3, 3)) in two across the middle of their longest side until none is further
+    than `max_radius` from its centre, the pieces cover the same surface'''
+    pieces = []
+    while len(corners) > 0:
+        radii = np.linalg.norm(corners - corners.mean(axis=1)[:, None], axis=2).max(axis=1)
+        small = radii <= max_radius
+        pieces.append(corners[small])
+        corners = corners[~small]
+        # turn each triangle so its longest side is from the first to the second corner
+        longest = np.linalg.norm(corners - np.roll(corners, -1, axis=1), axis=2).argmax(axis=1)
+        corners = corners[np.arange(len(corners))[:, None], (longest[:, None] + np.arange(3)) % 3]
+        a, b, c = corners.transpose(1, 0, 2)
+        middle = 0.5 * (a + b)
+        corners = np.concatenate([np.stack([a, middle, c], axis=1), np.stack([middle, b, c], axis=1)])
+    return np.concatenate(pieces)
+
+
+def surface_distance(points, verts, tris, chunk=20000):
+    '''Exact distance from each point to the surface (verts, tris)'''
+    if cKDTree is None:
+        return bvh_distance(points, verts, tris)
+    corners = verts[tris]
+    radii = np.linalg.norm(corners - corners.mean(axis=1)[:, None], axis=2).max(axis=1)
+    # long thin triangles (e.g. a fan across the bottom) are cut up so they do not widen the search for all
+    # the others
+    corners = split_triangles(corners, 2 * max(np.median(radii), 1e-9))
+    centres = corners.mean(axis=1)
+    # every point of a triangle is within its radius of its centre
+    radii = np.linalg.norm(corners - centres[:, None], axis=2).max(axis=1)
+    # an upper bound from the triangle with the closest centre
+    _, index = cKDTree(centres).query(points)
+    distance = point_triangle_distance(points, *corners[index].transpose(1, 0, 2))
+    # a closer triangle has its centre within that distance plus its radius, the triangles are grouped by
+    # radius (in powers of sqrt(2)) so the few larger ones do not widen the search for all the others
+    sizes = np.ceil(2 * np.log2(np.maximum(radii, 1e-9)))
+    for size in np.unique(sizes):
+        members = np.flatnonzero(sizes == size)
+        radius = radii[members].max()
+        tree = cKDTree(centres[members])
+        for start in range(0, len(points), chunk):
+            stop = min(start + chunk, len(points))
+            found = tree.query_ball_point(points[start:stop], distance[start:stop] + radius)
+            counts = np.array([len(f) for f in found])
+            if counts.sum() == 0:
+                continue
+            point_index = start + np.repeat(np.arange(stop - start), counts)
+            candidates = corners[members[np.concatenate([f for f in found if len(f) > 0]).astype(np.int64)]]
+            candidate_distance = point_triangle_distance(points[point_index], *candidates.transpose(1, 0, 2))
+            np.minimum.at(distance, point_index, candidate_distance)
+    return distance
+
+
+def bvh_distance(points, verts, tris):
+    '''Exact distance from each point to the surface with Blender's BVH tree (when scipy is not installed)'''
+    from mathutils.bvhtree import BVHTree
+    tree = BVHTree.FromPolygons(verts.tolist(), tris.tolist())
+    return np.array([tree.find_nearest(point)[3] for point in points.tolist()])
+
+
+def compare_meshes(mesh_a, mesh_b, n_samples=200000, seed=0):
+    '''Symmetric Hausdorff and RMS surface distance (sampled) and the volume change between two meshes'''
+    verts_a, tris_a = mesh_a
+    verts_b, tris_b = mesh_b
+    samples_a = sample_surface(verts_a, tris_a, n_samples, seed=seed)
+    samples_b = sample_surface(verts_b, tris_b, n_samples, seed=seed + 1)
+    a_to_b = surface_distance(samples_a, verts_b, tris_b)
+    b_to_a = surface_distance(samples_b, verts_a, tris_a)
+    distance = np.concatenate([a_to_b, b_to_a])
+    volume_a = signed_volume(verts_a, tris_a)
+    volume_b = signed_volume(verts_b, tris_b)
+    return {
+        'triangles_a': len(tris_a),
+        'triangles_b': len(tris_b),
+        'hausdorff': float(distance.max()),
+        'a_to_b_max': float(a_to_b.max()),
+        'b_to_a_max': float(b_to_a.max()),
+        'rms': float(np.sqrt(np.mean(distance**2))),
+        'volume_a': float(volume_a),
+        'volume_b': float(volume_b),
+        'volume_change': float((volume_b - volume_a) / volume_a) if volume_a != 0 else None
+    }
+
+
+def mesh_summary(verts, tris):
+    '''The triangle count, volume, area and bounding box of a mesh, small enough to keep in the repository
+    in place of the mesh itself'''
+    return {
+        'triangles': len(tris),
+        'volume': float(signed_volume(verts, tris)),
+        'area': float(triangle_areas(verts, tris).sum()),
+        'bbox_min': verts.min(axis=0).tolist(),
+        'bbox_max': verts.max(axis=0).tolist()
+    }
+
+
+def check_summary(summary, path, tolerance=0.05, volume_tolerance=0.001):
+    '''Print the comparison of a mesh file with the `mesh_summary` of its reference and return True if they match
+    within the tolerances (the bounding box within `tolerance`, the volume and area within `volume_tolerance`)'''
+    result = mesh_summary(*read_mesh(path))
+    bbox_change = max(
+        np.abs(np.array(result['bbox_min']) - summary['bbox_min']).max(),
+        np.abs(np.array(result['bbox_max']) - summary['bbox_max']).max()
+    )
+    volume_change = (result['volume'] - summary['volume']) / summary['volume'] if summary['volume'] != 0 else 0
+    area_change = (result['area'] - summary['area']) / summary['area'] if summary['area'] != 0 else 0
+    passed = (
+        (bbox_change <= tolerance) and
+        (abs(volume_change) <= volume_tolerance) and
+        (abs(area_change) <= volume_tolerance)
+    )
+    print('{0:<10} {1}: bbox {2:.4g}mm, volume {3:+.3%}, area {4:+.3%} ({5} -> {6} triangles)'.format(
+        'OK' if passed else 'CHANGED',
+        path,
+        bbox_change,
+        volume_change,
+        area_change,
+        summary['triangles'],
+        result['triangles']
+    ))
+    return passed
+
+
+def check_meshes(path_a, path_b, tolerance=0.05, volume_tolerance=0.001, n_samples=200000):
+    '''Print the comparison of two mesh files and return True if they match within the tolerances'''
+    result = compare_meshes(read_mesh(path_a), read_mesh(path_b), n_samples=n_samples)
+    passed = result['hausdorff'] <= tolerance
+    if result['volume_change'] is not None:
+        passed = passed and (abs(result['volume_change']) <= volume_tolerance)
+    print('{0:<10} {1} -> {2}: hausdorff {3:.4g}mm, rms {4:.4g}mm, volume {5:+.3%} ({6} -> {7} triangles)'.format(
+        'OK' if passed else 'CHANGED',
+        path_a,
+        path_b,
+        result['hausdorff'],
+        result['rms'],
+        result['volume_change'] or 0,
+        result['triangles_a'],
+        result['triangles_b']
+    ))
+    return passed
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Compare the surfaces and volumes of two `.stl` or `.ply` meshes'
+    )
+    parser.add_argument(
+        'mesh_a',
+        type=str,
+        help='the reference mesh'
+    )
+    parser.add_argument(
+        'mesh_b',
+        type=str,
+        help='the new mesh'
+    )
+    parser.add_argument(
+        '-t',
+        '--tolerance',
+        type=float,
+        default=0.05,
+        help='the largest distance (in mm) between the surfaces that counts as unchanged'
+    )
+    parser.add_argument(
+        '-v',
+        '--volume-tolerance',
+        type=float,
+        default=0.001,
+        help='the largest fractional change in volume that counts as unchanged'
+    )
+    parser.add_argument(
+        '-n',
+        '--samples',
+        type=int,
+        default=200000,
+        help='the number of points sampled on each surface'
+    )
+    args = parser.parse_args()
+    passed = check_meshes(
+        args.mesh_a,
+        args.mesh_b,
+        tolerance=args.tolerance,
+        volume_tolerance=args.volume_tolerance,
+        n_samples=args.samples
+    )
+    raise SystemExit(0 if passed else 1)
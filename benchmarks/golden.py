@@ -0,0 +1,137 @@
+import bpy
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden')
+# the triangle count, volume, area and bounding box of each golden file, kept in the repository so the check
+# can run without the (large) `.stl` files
+SUMMARY_FILE = os.path.join(GOLDEN_DIR, 'summary.json')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import compare_meshes  # noqa: E402
+from make_model import make_model  # noqa: E402
+from make_holder import make_holder  # noqa: E402
+from batch_utils import reset_scene  # noqa: E402
+
+CASES = [
+    ('model', 'example_model_config.json', make_model),
+    ('holder', 'example_holder_config.json', make_holder)
+]
+
+
+def build_case(name, config_file, build, output_path):
+    '''Build one of the example configs into `output_path`, returns the `.stl` files written'''
+    with open(os.path.join(ROOT, config_file)) as config_json:
+        config = json.load(config_json)
+    config['output_path'] = output_path
+    config['output_name'] = name
+    config['outputs'] = 'stl_only'
+    config.pop('manifest', None)
+    if 'input_file_path' in config:
+        config['input_file_path'] = os.path.join(ROOT, config['input_file_path'])
+    result = build(config)
+    return [path for path in result['outputs'].values() if path.endswith('.stl')]
+
+
+def read_summary():
+    if not os.path.isfile(SUMMARY_FILE):
+        return {}
+    with open(SUMMARY_FILE) as summary_json:
+        return json.load(summary_json)
+
+
+def write_summary(summary):
+    with open(SUMMARY_FILE, 'w') as summary_json:
+        json.dump(summary, summary_json, indent=2, sort_keys=True)
+
+
+def run(update=False, tolerance=0.05, volume_tolerance=0.001, n_samples=200000):
+    '''Build the example configs and compare every `.stl` with the stored golden outputs (or replace them). The
+    surfaces are compared when the golden `.stl` is there, otherwise only the summary in `summary.json`'''
+    startup_file = bpy.data.filepath
+    output_path = tempfile.mkdtemp(prefix='tu_golden_')
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    summary = read_summary()
+    failures = []
+    for name, config_file, build in CASES:
+        reset_scene(startup_file)
+        for path in build_case(name, config_file, build, output_path):
+            file_name = os.path.basename(path)
+            golden_path = os.path.join(GOLDEN_DIR, file_name)
+            if update:
+                shutil.copyfile(path, golden_path)
+                summary[file_name] = compare_meshes.mesh_summary(*compare_meshes.read_mesh(path))
+                print('UPDATED    {0}'.format(golden_path))
+            elif os.path.isfile(golden_path):
+                if not compare_meshes.check_meshes(
+                    golden_path,
+                    path,
+                    tolerance=tolerance,
+                    volume_tolerance=volume_tolerance,
+                    n_samples=n_samples
+                ):
+                    failures.append(golden_path)
+            elif file_name in summary:
+                if not compare_meshes.check_summary(
+                    summary[file_name],
+                    path,
+                    tolerance=tolerance,
+                    volume_tolerance=volume_tolerance
+                ):
+                    failures.append(golden_path)
+            else:
+                print('MISSING    {0}'.format(golden_path))
+                failures.append(golden_path)
+    if update:
+        write_summary(summary)
+    shutil.rmtree(output_path)
+    return failures
+
+
+if __name__ == '__main__':
+    import argparse
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    parser = argparse.ArgumentParser(
+        prog='blender TU_startup.blend -b --python benchmarks/golden.py --',
+        description='Check the example model and holder against the stored golden `.stl` files'
+    )
+    parser.add_argument(
+        '-u',
+        '--update',
+        action='store_true',
+        help='replace the golden files and their summary with the current outputs'
+    )
+    parser.add_argument(
+        '-t',
+        '--tolerance',
+        type=float,
+        default=0.05,
+        help='the largest distance (in mm) between the surfaces that counts as unchanged'
+    )
+    parser.add_argument(
+        '-v',
+        '--volume-tolerance',
+        type=float,
+        default=0.001,
+        help='the largest fractional change in volume that counts as unchanged'
+    )
+    parser.add_argument(
+        '-n',
+        '--samples',
+        type=int,
+        default=200000,
+        help='the number of points sampled on each surface'
+    )
+    args = parser.parse_args(argv)
+    failures = run(
+        update=args.update,
+        tolerance=args.tolerance,
+        volume_tolerance=args.volume_tolerance,
+        n_samples=args.samples
+    )
+    print('{0} golden file(s) changed or missing'.format(len(failures)))
+    sys.exit(1 if len(failures) > 0 else 0)
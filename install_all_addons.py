@@ -1,11 +1,28 @@
 import bpy
 import os
+import tempfile
+import zipfile
 
 # get current directory
 current_dir = os.getcwd()
 
-# install and activate `emboss plane`
-tu_plugin_filepath = os.path.join(current_dir, 'tactile_universe_plugin.zip')
+
+def build_plugin_zip(plugin_dir, zip_path):
+    '''Zip the plugin folder (without any cached `.pyc` files) so the installed add-on matches the scripts'''
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as plugin_zip:
+        for root, dirs, files in os.walk(plugin_dir):
+            dirs[:] = [d for d in dirs if d != '__pycache__']
+            for file_name in files:
+                if file_name.endswith('.pyc'):
+                    continue
+                file_path = os.path.join(root, file_name)
+                plugin_zip.write(file_path, os.path.relpath(file_path, os.path.dirname(plugin_dir)))
+
+
+# install and activate `emboss plane`, built from the plugin folder so `make_model.py` and `make_holder.py`
+# always get the modules they use
+tu_plugin_filepath = os.path.join(tempfile.mkdtemp(), 'tactile_universe_plugin.zip')
+build_plugin_zip(os.path.join(current_dir, 'tactile_universe_plugin'), tu_plugin_filepath)
 bpy.ops.extensions.package_install_files(
     filepath=tu_plugin_filepath,
     repo='user_default',
@@ -2,55 +2,129 @@ import bpy
 import json
 import sys
 import os
+import traceback
 
-argv = sys.argv
-if '--' not in argv:
-    raise ValueError('You must pass a configuration file on the command line after ` -- `')
-
-argv = argv[argv.index('--') + 1:]
-
-if len(argv) == 0:
-    raise ValueError('No configuration file passed in')
-elif len(argv) > 1:
-    raise ValueError('Only pass in one configuration file')
-
-with open(argv[0]) as config_file:
-    config = json.load(config_file)
-
-# set defaults
-config.setdefault('holder_keywords', {})
-config.setdefault('output_path', os.getcwd())
-config.setdefault('ouput_name', 'holder')
-
-# create holder
-bpy.ops.object.holder(
-    **config['holder_keywords']
-)
-
-base_path = os.path.join(
-    config['output_path'],
-    config['output_name']
-)
-
-stl_base_file_path = '{0}_base.stl'.format(base_path)
-bpy.ops.wm.stl_export(
-    filepath=stl_base_file_path,
-    check_existing=False,
-    export_selected_objects=True
-)
-
-bpy.ops.object.select_all(action='INVERT')
-stl_lid_file_path = '{0}_lid.stl'.format(base_path)
-bpy.ops.wm.stl_export(
-    filepath=stl_lid_file_path,
-    check_existing=False,
-    export_selected_objects=True
-)
-
-bpy.ops.file.pack_all()
-blend_file_path = '{0}.blend'.format(base_path)
-bpy.ops.wm.save_mainfile(
-    filepath=blend_file_path,
-    check_existing=False
-)
-bpy.ops.wm.quit_blender()
+
+def get_plugin():
+    # the add-on's package name depends on how it was installed (legacy add-on or extension)
+    for module_name, module in sys.modules.items():
+        if module_name.split('.')[-1] == 'tactile_universe_plugin':
+            return module
+    raise ImportError('The Tactile Universe plugin must be installed and enabled')
+
+
+def make_holder(config):
+    '''Make the holder described by `config`, returns the output file paths and the timings'''
+    plugin = get_plugin()
+    job = plugin.manifest.Job(
+        config.get('manifest', ''),
+        config.get('job_id', config.get('output_name', 'holder')),
+        config
+    )
+    previous = job.completed()
+    if previous is not None:
+        print('{0} is already built, skipping'.format(job.job_id))
+        # the manifest record is kept whole under its own key so it does not replace the job's details
+        return {'outputs': previous.get('outputs', {}), 'skipped': True, 'previous': previous}
+    job.start()
+    timer = plugin.timing.StageTimer(job.job_id, callback=job.stage)
+    try:
+        result = build_holder(config, plugin, timer)
+    except Exception:
+        job.error(traceback.format_exc())
+        raise
+    job.done(result['outputs'], timing=result['timing'])
+    return result
+
+
+def build_holder(config, plugin, timer):
+    # set defaults
+    config.setdefault('holder_keywords', {})
+    config.setdefault('output_path', os.getcwd())
+    config.setdefault('output_name', 'holder')
+    config.setdefault('outputs', 'full')
+    config.setdefault('measure', {})
+    output_settings = plugin.output_files.get_outputs(config['outputs'])
+
+    # create holder
+    with timer.stage('holder'):
+        bpy.ops.object.holder(
+            **config['holder_keywords']
+        )
+        base_objects = list(bpy.context.selected_objects)
+        lid_objects = [obj for obj in bpy.context.scene.objects if obj not in base_objects]
+
+    base_path = os.path.join(
+        config['output_path'],
+        config['output_name']
+    )
+
+    # evaluate the base and lid once and share the arrays between the measures and exports
+    with timer.stage('evaluate'):
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        parts = {
+            'base': plugin.mesh_export.scene_parts(base_objects, depsgraph),
+            'lid': plugin.mesh_export.scene_parts(lid_objects, depsgraph)
+        }
+
+    outputs = {}
+    io = {}
+    with timer.stage('measure'):
+        measures = {
+            part: plugin.measure.measure_parts({name: (name, verts, tris) for name, verts, tris in part_list}, config['measure'])
+            for part, part_list in parts.items()
+        }
+        outputs['measure'] = '{0}_measure.json'.format(base_path)
+        plugin.measure.write_measures(outputs['measure'], **measures)
+    for part, part_measures in measures.items():
+        print('{0}: {1}'.format(part, plugin.measure.format_measures(part_measures)))
+
+    if output_settings['stl']:
+        with timer.stage('export_stl'):
+            for part, part_list in parts.items():
+                key = 'stl_{0}'.format(part)
+                outputs[key] = '{0}_{1}.stl'.format(base_path, part)
+                io[key] = plugin.output_files.write_stl(outputs[key], part_list, {})
+
+    if output_settings['ply'] or output_settings['3mf']:
+        with timer.stage('export_indexed'):
+            for part, part_list in parts.items():
+                indexed_outputs, indexed_io = plugin.output_files.write_indexed(
+                    '{0}_{1}'.format(base_path, part),
+                    output_settings,
+                    part_list
+                )
+                outputs.update({'{0}_{1}'.format(k, part): v for k, v in indexed_outputs.items()})
+                io.update({'{0}_{1}'.format(k, part): v for k, v in indexed_io.items()})
+
+    if output_settings['blend'] != 'none':
+        with timer.stage('save_blend'):
+            outputs['blend'] = '{0}.blend'.format(base_path)
+            io['blend'] = plugin.output_files.save_blend(outputs['blend'], output_settings['blend'])
+
+    print(plugin.output_files.format_io(io))
+    return {
+        'outputs': outputs,
+        'timing': timer.to_dict(),
+        'io': io,
+        'measure': measures
+    }
+
+
+if __name__ == '__main__':
+    argv = sys.argv
+    if '--' not in argv:
+        raise ValueError('You must pass a configuration file on the command line after ` -- `')
+
+    argv = argv[argv.index('--') + 1:]
+
+    if len(argv) == 0:
+        raise ValueError('No configuration file passed in')
+    elif len(argv) > 1:
+        raise ValueError('Only pass in one configuration file')
+
+    with open(argv[0]) as config_file:
+        config = json.load(config_file)
+
+    make_holder(config)
+    bpy.ops.wm.quit_blender()
@@ -3,95 +3,297 @@ import bmesh
 import json
 import sys
 import os
+import traceback
 
-argv = sys.argv
-if '--' not in argv:
-    raise ValueError('You must pass a configuration file on the command line after ` -- `')
 
-argv = argv[argv.index('--') + 1:]
+def get_plugin():
+    # the add-on's package name depends on how it was installed (legacy add-on or extension)
+    for module_name, module in sys.modules.items():
+        if module_name.split('.')[-1] == 'tactile_universe_plugin':
+            return module
+    raise ImportError('The Tactile Universe plugin must be installed and enabled')
 
-if len(argv) == 0:
-    raise ValueError('No configuration file passed in')
-elif len(argv) > 1:
-    raise ValueError('Only pass in one configuration file')
 
-with open(argv[0]) as config_file:
-    config = json.load(config_file)
+def view3d_find(return_area=False):
+    # returns first 3d view, normally we get from context
+    if bpy.context.window is not None:
+        for area in bpy.context.window.screen.areas:
+            if area.type == 'VIEW_3D':
+                v3d = area.spaces[0]
+                rv3d = v3d.region_3d
+                for region in area.regions:
+                    if region.type == 'WINDOW':
+                        if return_area:
+                            return region, rv3d, v3d, area
+                        return region, rv3d, v3d
+    # no 3d view (e.g. a factory settings or background Blender)
+    if return_area:
+        return None, None, None, None
+    return None, None, None
 
-if 'input_file_path' not in config:
-    raise ValueError('the config file must contain the keyword `input_file_path`')
 
-# set defaults
-config.setdefault('plane_height', 112)
-config.setdefault('emboss_plane_keywords', {})
-config.setdefault('output_path', os.getcwd())
-config.setdefault('output_name', 'output')
-config.setdefault('stl_keywords', {})
+def emboss(keywords, override):
+    bpy.ops.object.editmode_toggle()
+    with bpy.context.temp_override(**override):
+        bpy.ops.object.emboss_plane(**keywords)
+    bpy.ops.object.editmode_toggle()
 
-input_name = os.path.basename(config['input_file_path'])
-input_dir = os.path.dirname(config['input_file_path'])
 
-if input_dir == '':
-    input_dir = os.getcwd()
+def make_model(config, dry_run=False):
+    '''Make the model described by `config`, returns the output file paths and the timings'''
+    if 'input_file_path' not in config:
+        raise ValueError('the config file must contain the keyword `input_file_path`')
+    plugin = get_plugin()
+    job = plugin.manifest.Job(
+        config.get('manifest', ''),
+        config.get('job_id', config.get('output_name', 'output')),
+        config
+    )
+    if dry_run or config.get('dry_run', False):
+        return build_model(config, plugin, plugin.timing.StageTimer(job.job_id), dry_run=True)
+    previous = job.completed()
+    if previous is not None:
+        print('{0} is already built, skipping'.format(job.job_id))
+        # the manifest record is kept whole under its own key so it does not replace the job's details
+        return {'outputs': previous.get('outputs', {}), 'skipped': True, 'previous': previous}
+    job.start()
+    timer = plugin.timing.StageTimer(job.job_id, callback=job.stage)
+    try:
+        result = build_model(config, plugin, timer)
+    except Exception:
+        job.error(traceback.format_exc())
+        raise
+    job.done(result['outputs'], timing=result['timing'], validation=result['validation'])
+    return result
 
-# import image as plane
-bpy.ops.image.import_as_mesh_planes(
-    files=[{'name': input_name}],
-    directory=input_dir,
-    height=config['plane_height'],
-    relative=False
-)
 
+def build_model(config, plugin, timer, dry_run=False):
+    # set defaults
+    config.setdefault('plane_height', 112)
+    config.setdefault('emboss_plane_keywords', {})
+    config.setdefault('output_path', os.getcwd())
+    config.setdefault('output_name', 'output')
+    config.setdefault('stl_keywords', {})
+    config.setdefault('timing_report', False)
+    config.setdefault('dry_run', False)
+    config.setdefault('budget', {})
+    config.setdefault('cost_model', {})
+    config.setdefault('decimate_tolerance', 0)
+    config.setdefault('outputs', 'full')
+    config.setdefault('lods', [])
+    config.setdefault('validation', {})
+    config.setdefault('measure', {})
+    output_settings = plugin.output_files.get_outputs(config['outputs'])
+    # before any of the work is done
+    plugin.output_files.check_stl_keywords(config['stl_keywords'])
 
-def view3d_find(return_area=False):
-    # returns first 3d view, normally we get from context
-    for area in bpy.context.window.screen.areas:
-        if area.type == 'VIEW_3D':
-            v3d = area.spaces[0]
-            rv3d = v3d.region_3d
-            for region in area.regions:
-                if region.type == 'WINDOW':
-                    if return_area:
-                        return region, rv3d, v3d, area
-                    return region, rv3d, v3d
-    return None, None
-
-
-region, rv3d, v3d, area = view3d_find(True)
-override = {
-    'scene': bpy.context.scene,
-    'screen': bpy.context.screen,
-    'active_object': bpy.context.active_object,
-    'window': bpy.context.window,
-    'blend_data': bpy.context.blend_data,
-    'region': region,
-    'area': area,
-    'space': v3d
-}
-
-name = bpy.context.active_object.name
-bpy.ops.object.editmode_toggle()
-with bpy.context.temp_override(**override):
-    bpy.ops.object.emboss_plane(**config['emboss_plane_keywords'])
-bpy.ops.object.editmode_toggle()
-
-base_path = os.path.join(
-    config['output_path'],
-    config['output_name']
-)
-
-bpy.ops.file.pack_all()
-blend_file_path = '{0}.blend'.format(base_path)
-bpy.ops.wm.save_mainfile(
-    filepath=blend_file_path,
-    check_existing=False
-)
-
-stl_file_path = '{0}.stl'.format(base_path)
-bpy.ops.wm.stl_export(
-    filepath=stl_file_path,
-    check_existing=False,
-    **config['stl_keywords']
-)
-
-bpy.ops.wm.quit_blender()
+    input_name = os.path.basename(config['input_file_path'])
+    input_dir = os.path.dirname(config['input_file_path'])
+
+    if input_dir == '':
+        input_dir = os.getcwd()
+
+    # estimate the cost of the build from the image size before doing any of the work
+    input_file_path = os.path.join(input_dir, input_name)
+    image_size = plugin.mesh_budget.read_image_size(input_file_path)
+    if image_size is None:
+        image_size = tuple(bpy.data.images.load(input_file_path, check_existing=True).size)
+    lx, ly = plugin.mesh_budget.plane_size(image_size, config['plane_height'])
+    emboss_plane_rna = bpy.ops.object.emboss_plane.get_rna_type()
+    emboss_keywords = {p.identifier: p.default for p in emboss_plane_rna.properties if p.identifier != 'rna_type'}
+    emboss_keywords.update(config['emboss_plane_keywords'])
+    # a triangle or STL size target on the emboss replaces the Fpu
+    emboss_keywords['Fpu'] = plugin.mesh_budget.choose_fpu(lx, ly, emboss_keywords, costs=config['cost_model'])
+    if emboss_keywords['Fpu'] is None:
+        raise ValueError('No grid fits the `Triangle_budget`/`Stl_budget` of the emboss')
+    estimate = plugin.mesh_budget.estimate_model(lx, ly, emboss_keywords, costs=config['cost_model'])
+    print('Estimate: {0}'.format(plugin.mesh_budget.format_estimate(estimate)))
+
+    problems = plugin.mesh_budget.over_budget(estimate, config['budget'])
+    if len(problems) > 0:
+        if config['budget'].get('action', 'refuse') != 'reduce':
+            raise ValueError('The model is over budget: {0}'.format(', '.join(problems)))
+        fpu = plugin.mesh_budget.fit_fpu(lx, ly, emboss_keywords, config['budget'], costs=config['cost_model'])
+        if fpu is None:
+            raise ValueError('The model can not fit the budget at any Fpu: {0}'.format(', '.join(problems)))
+        config['emboss_plane_keywords']['Fpu'] = fpu
+        config['emboss_plane_keywords']['Triangle_budget'] = 0
+        config['emboss_plane_keywords']['Stl_budget'] = 0
+        emboss_keywords['Fpu'] = fpu
+        estimate = plugin.mesh_budget.estimate_model(lx, ly, emboss_keywords, costs=config['cost_model'])
+        print('Fpu reduced to fit the budget: {0}'.format(plugin.mesh_budget.format_estimate(estimate)))
+
+    if dry_run or config['dry_run']:
+        return {'outputs': {}, 'estimate': estimate}
+
+    # make a plane the size of the image
+    with timer.stage('import_plane'):
+        plugin.image_plane.make_image_plane(input_file_path, config['plane_height'])
+
+    region, rv3d, v3d, area = view3d_find(True)
+    override = {}
+    if area is not None:
+        override = {
+            'scene': bpy.context.scene,
+            'screen': bpy.context.screen,
+            'active_object': bpy.context.active_object,
+            'window': bpy.context.window,
+            'blend_data': bpy.context.blend_data,
+            'region': region,
+            'area': area,
+            'space': v3d
+        }
+
+    name = bpy.context.active_object.name
+    with timer.stage('emboss', bpy.data.objects[name]):
+        emboss(config['emboss_plane_keywords'], override)
+    # read now, each LOD re-runs the emboss and replaces it
+    emboss_timing = json.loads(bpy.data.objects[name]['TU_timing'])
+
+    base_path = os.path.join(
+        config['output_path'],
+        config['output_name']
+    )
+
+    outputs = {}
+    io = {}
+    if output_settings['blend'] != 'none':
+        with timer.stage('save_blend'):
+            outputs['blend'] = '{0}.blend'.format(base_path)
+            io['blend'] = plugin.output_files.save_blend(outputs['blend'], output_settings['blend'])
+
+    decimate_stats = None
+    if config['decimate_tolerance'] > 0:
+        # simplify flat areas of the evaluated model (the .blend keeps the full modifier stack)
+        with timer.stage('decimate', bpy.data.objects[name]):
+            decimate_stats = plugin.decimate.decimate_object(
+                bpy.data.objects[name],
+                bpy.context.evaluated_depsgraph_get(),
+                config['decimate_tolerance']
+            )
+        print(plugin.decimate.format_stats(decimate_stats))
+
+    # evaluate the modifiers and text of every part once and share the arrays between the checks and exports
+    with timer.stage('evaluate'):
+        parts = plugin.output_files.model_parts(
+            bpy.data.objects[name],
+            bpy.context.evaluated_depsgraph_get()
+        )
+
+    # spikes are found with the same threshold as the emboss unless one is given
+    validation_settings = dict({'spike_threshold': emboss_keywords['Spike_threshold']}, **config['validation'])
+    validation = None
+    if validation_settings.get('action', 'report') != 'none':
+        with timer.stage('validate'):
+            validation = plugin.validation.validate_parts(parts, validation_settings)
+        print(plugin.validation.format_report(validation))
+        if (not validation['passed']) and (validation_settings.get('action') == 'refuse'):
+            raise ValueError(plugin.validation.format_report(validation))
+
+    with timer.stage('measure'):
+        measures = plugin.measure.measure_parts(parts, config['measure'])
+        outputs['measure'] = '{0}_measure.json'.format(base_path)
+        plugin.measure.write_measures(outputs['measure'], **measures)
+    print(plugin.measure.format_measures(measures))
+
+    if output_settings['stl']:
+        with timer.stage('export_stl'):
+            stl_outputs, stl_io = plugin.output_files.write_stls(
+                base_path,
+                output_settings,
+                parts,
+                config['stl_keywords']
+            )
+            outputs.update(stl_outputs)
+            io.update(stl_io)
+
+    if output_settings['ply'] or output_settings['3mf']:
+        with timer.stage('export_indexed'):
+            indexed_outputs, indexed_io = plugin.output_files.write_indexed(
+                base_path,
+                output_settings,
+                list(parts.values())
+            )
+            outputs.update(indexed_outputs)
+            io.update(indexed_io)
+
+    # extra resolutions of the same model, the filtered images, text and sub-objects
+    # from the main build are reused so only the emboss itself is re-made
+    lods = []
+    for lod in config['lods']:
+        lod = dict(lod)
+        lod_name = lod.pop('name')
+        lod_tolerance = lod.pop('decimate_tolerance', 0)
+        # the budgets of the main build would replace the Fpu of the LOD
+        lod_keywords = dict(config['emboss_plane_keywords'], Triangle_budget=0, Stl_budget=0)
+        lod_keywords.update(lod)
+        lod_keywords['Sub_objects'] = False
+        with timer.stage('lod_{0}'.format(lod_name), bpy.data.objects[name]):
+            emboss(lod_keywords, override)
+            if lod_tolerance > 0:
+                plugin.decimate.decimate_object(
+                    bpy.data.objects[name],
+                    bpy.context.evaluated_depsgraph_get(),
+                    lod_tolerance
+                )
+            # only the model itself changes, the other parts are the ones from the main build
+            lod_parts = plugin.output_files.model_parts(
+                bpy.data.objects[name],
+                bpy.context.evaluated_depsgraph_get(),
+                reuse={key: part for key, part in parts.items() if key != 'model'}
+            )
+            key = 'stl_{0}'.format(lod_name)
+            outputs[key] = '{0}_{1}.stl'.format(base_path, lod_name)
+            io[key] = plugin.output_files.write_stl(outputs[key], list(lod_parts.values()), config['stl_keywords'])
+        lods.append({
+            'name': lod_name,
+            'triangles': sum(len(tris) for _, _, tris in lod_parts.values()),
+            'time': timer.stages[-1]['time'],
+            'emboss_plane': json.loads(bpy.data.objects[name]['TU_timing'])
+        })
+        print('LOD {0}: {1} triangles in {2:.2f}s'.format(lod_name, lods[-1]['triangles'], lods[-1]['time']))
+
+    print(timer.summary())
+    print(plugin.output_files.format_io(io))
+    if config['timing_report']:
+        outputs['timing_report'] = '{0}_timing.json'.format(base_path)
+        timer.write(
+            outputs['timing_report'],
+            emboss_plane=emboss_timing,
+            decimate=decimate_stats,
+            io=io,
+            lods=lods,
+            validation=validation,
+            measure=measures
+        )
+    return {
+        'outputs': outputs,
+        'timing': timer.to_dict(),
+        'io': io,
+        'emboss_plane': emboss_timing,
+        'decimate': decimate_stats,
+        'lods': lods,
+        'validation': validation,
+        'measure': measures
+    }
+
+
+if __name__ == '__main__':
+    argv = sys.argv
+    if '--' not in argv:
+        raise ValueError('You must pass a configuration file on the command line after ` -- `')
+
+    argv = argv[argv.index('--') + 1:]
+    dry_run = '--dry-run' in argv
+    argv = [a for a in argv if a != '--dry-run']
+
+    if len(argv) == 0:
+        raise ValueError('No configuration file passed in')
+    elif len(argv) > 1:
+        raise ValueError('Only pass in one configuration file')
+
+    with open(argv[0]) as config_file:
+        config = json.load(config_file)
+
+    make_model(config, dry_run=dry_run)
+    bpy.ops.wm.quit_blender()
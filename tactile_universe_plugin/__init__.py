@@ -1,7 +1,24 @@
+import bpy
+from bpy.props import BoolProperty, StringProperty
 from . import holder
 from . import name_plate
 from . import back_frame
 from . import emboss_plane
+from . import text_cache
+from . import timing
+from . import profiling
+from . import mesh_budget
+from . import heightmap
+from . import rtin
+from . import decimate
+from . import cleanup
+from . import manifest
+from . import image_plane
+from . import output_files
+from . import mesh_export
+from . import validation
+from . import measure
+from . import geometry_nodes
 
 bl_info = {
     'name': 'Tactile Universe',
@@ -14,11 +31,54 @@ bl_info = {
 }
 
 
+class TactileUniversePreferences(bpy.types.AddonPreferences):
+    bl_idname = __name__
+
+    Profile_cprofile: BoolProperty(
+        name='cProfile',
+        default=False,
+        description='Write a cProfile `.prof` file each time a Tactile Universe operator runs (applied when the add-on is enabled)'
+    )
+    Profile_tracemalloc: BoolProperty(
+        name='tracemalloc',
+        default=False,
+        description='Write a tracemalloc snapshot each time a Tactile Universe operator runs (applied when the add-on is enabled)'
+    )
+    Profile_directory: StringProperty(
+        name='Profile folder',
+        default='',
+        subtype='DIR_PATH',
+        description='Folder the profiles are written to (defaults to the current working directory)'
+    )
+
+    def draw(self, context):
+        layout = self.layout
+        box = layout.box()
+        box.label(text='Profiling (can be overridden with the TU_PROFILE and TU_PROFILE_DIR environment variables)')
+        row = box.row()
+        row.prop(self, 'Profile_cprofile')
+        row.prop(self, 'Profile_tracemalloc')
+        box.prop(self, 'Profile_directory')
+
+
+def get_preferences():
+    addon = bpy.context.preferences.addons.get(__name__)
+    if addon is None:
+        return None
+    return addon.preferences
+
+
 def register():
+    bpy.utils.register_class(TactileUniversePreferences)
+    # the operators are only wrapped when profiling is on so there is no cost otherwise
+    modes, directory = profiling.get_settings(get_preferences())
+    for operator in [holder.Holder, name_plate.NamePlate, back_frame.BackFrame, emboss_plane.EmbossPlane]:
+        profiling.instrument(operator, modes, directory)
     holder.register()
     name_plate.register()
     back_frame.register()
     emboss_plane.register()
+    cleanup.register()
 
 
 def unregister():
@@ -26,6 +86,8 @@ def unregister():
     name_plate.unregister()
     back_frame.unregister()
     emboss_plane.unregister()
+    cleanup.unregister()
+    bpy.utils.unregister_class(TactileUniversePreferences)
 
 
 if __name__ == '__main__':
@@ -148,6 +148,7 @@ class BackFrame(bpy.types.Operator):
         if name_frame_mesh_key in bpy.data.meshes.keys():
             bpy.data.meshes.remove(bpy.data.meshes[name_frame_mesh_key], do_unlink=True)
         me = bpy.data.meshes.new(name_frame_mesh_key)
+        me['tu_made'] = True
         frame = bpy.data.objects.new(name_frame_object_key, me)
         bpy.context.scene.collection.objects.link(frame)
         me.from_pydata(verts, [], faces)
@@ -0,0 +1,87 @@
+import bpy
+from bpy.props import BoolProperty
+from . import holder
+from . import text_cache
+
+# the kinds of datablock the Tactile Universe operators make, each one they make has a `tu_made` property
+DATA_COLLECTIONS = ['meshes', 'curves', 'textures', 'images', 'materials']
+
+
+def datablock_counts():
+    '''Number of objects and of each kind of datablock the operators make'''
+    counts = {'objects': len(bpy.data.objects)}
+    for collection_name in DATA_COLLECTIONS:
+        counts[collection_name] = len(getattr(bpy.data, collection_name))
+    return counts
+
+
+def purge_orphans():
+    '''Remove the meshes, curves, textures, images and materials made by the operators (with a `tu_made` property)
+    that nothing uses, returns the number removed'''
+    removed = 0
+    # removing a texture or material can leave its image unused, so repeat until nothing changes
+    while True:
+        orphans = []
+        for collection_name in DATA_COLLECTIONS:
+            orphans += [
+                datablock for datablock in getattr(bpy.data, collection_name)
+                if (datablock.users == 0) and (not datablock.use_fake_user) and datablock.get('tu_made', False)
+            ]
+        if len(orphans) == 0:
+            return removed
+        bpy.data.batch_remove(orphans)
+        removed += len(orphans)
+
+
+def reset(remove_objects=False):
+    '''Free the data left over from earlier models so long sessions do not keep growing'''
+    if remove_objects:
+        if (bpy.context.object is not None) and (bpy.context.object.mode != 'OBJECT'):
+            bpy.ops.object.mode_set(mode='OBJECT')
+        bpy.data.batch_remove(list(bpy.data.objects))
+        # the holder names restart only once the holders they could clash with are gone
+        holder.Holder.class_counter = 0
+    text_cache.clear()
+    return purge_orphans()
+
+
+class CleanUp(bpy.types.Operator):
+    '''TU Clean Up'''
+
+    bl_idname = 'object.tu_cleanup'
+    bl_label = 'Remove unused Tactile Universe data'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    Remove_objects: BoolProperty(
+        name='Remove Objects',
+        default=False,
+        description='Also remove every object in the file (e.g. before making the next model)'
+    )
+
+    def execute(self, context):
+        before = datablock_counts()
+        removed = reset(remove_objects=self.Remove_objects)
+        after = datablock_counts()
+        self.report({'INFO'}, 'Removed {0} unused datablocks and {1} objects'.format(
+            removed,
+            before['objects'] - after['objects']
+        ))
+        return {'FINISHED'}
+
+
+def add_object_button(self, context):
+    self.layout.operator(CleanUp.bl_idname, text=CleanUp.__doc__)
+
+
+def register():
+    bpy.utils.register_class(CleanUp)
+    bpy.types.VIEW3D_MT_object.append(add_object_button)
+
+
+def unregister():
+    bpy.utils.unregister_class(CleanUp)
+    bpy.types.VIEW3D_MT_object.remove(add_object_button)
+
+
+if __name__ == '__main__':
+    register()
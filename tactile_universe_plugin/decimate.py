@@ -0,0 +1,97 @@
+import bpy
+import bmesh
+import math
+from . import mesh_budget
+
+
+def planar_regions(bm, tolerance, angle_limit):
+    '''Group faces into regions that all lie within `tolerance` of the plane of the region's first face'''
+    cos_limit = math.cos(angle_limit)
+    region = [-1] * len(bm.faces)
+    for seed in bm.faces:
+        if region[seed.index] != -1:
+            continue
+        normal = seed.normal.copy()
+        offset = normal.dot(seed.verts[0].co)
+        region[seed.index] = seed.index
+        stack = [seed]
+        while stack:
+            face = stack.pop()
+            for edge in face.edges:
+                for other in edge.link_faces:
+                    if region[other.index] != -1:
+                        continue
+                    if other.normal.dot(normal) < cos_limit:
+                        continue
+                    if any(abs(normal.dot(v.co) - offset) > tolerance for v in other.verts):
+                        continue
+                    region[other.index] = seed.index
+                    stack.append(other)
+    return region
+
+
+def is_watertight(bm):
+    return all(e.is_manifold for e in bm.edges)
+
+
+def planar_decimate(obj, depsgraph, tolerance, angle_limit=math.radians(15)):
+    '''Make a simplified copy of the evaluated mesh of `obj` with every vertex within `tolerance` of the original surface'''
+    mesh = bpy.data.meshes.new_from_object(obj.evaluated_get(depsgraph))
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
+    bmesh.ops.triangulate(bm, faces=bm.faces[:])
+    triangles_before = len(bm.faces)
+    watertight_before = is_watertight(bm)
+    bm.faces.ensure_lookup_table()
+    bm.faces.index_update()
+    bm.normal_update()
+    # every face of a region is within tolerance / 2 of the region's plane, so
+    # replacing the region with a flat polygon moves it by at most tolerance
+    region = planar_regions(bm, 0.5 * tolerance, angle_limit)
+    interior_edges = [
+        e for e in bm.edges
+        if (len(e.link_faces) == 2) and (region[e.link_faces[0].index] == region[e.link_faces[1].index])
+    ]
+    bmesh.ops.dissolve_edges(bm, edges=interior_edges, use_verts=False)
+    # remove the vertices left in the middle of straight edges
+    bmesh.ops.dissolve_limit(bm, angle_limit=1e-4, verts=bm.verts[:], edges=[])
+    bmesh.ops.triangulate(bm, faces=bm.faces[:], quad_method='BEAUTY', ngon_method='BEAUTY')
+    triangles_after = len(bm.faces)
+    watertight_after = is_watertight(bm)
+    bm.to_mesh(mesh)
+    bm.free()
+    stats = {
+        'tolerance': tolerance,
+        'triangles_before': triangles_before,
+        'triangles_after': triangles_after,
+        'stl_mb_before': (mesh_budget.STL_HEADER_BYTES + mesh_budget.STL_TRIANGLE_BYTES * triangles_before) / 1024**2,
+        'stl_mb_after': (mesh_budget.STL_HEADER_BYTES + mesh_budget.STL_TRIANGLE_BYTES * triangles_after) / 1024**2,
+        'watertight_before': watertight_before,
+        'watertight_after': watertight_after
+    }
+    return mesh, stats
+
+
+def decimate_object(obj, depsgraph, tolerance):
+    '''Replace the mesh and modifier stack of `obj` with a simplified copy of its evaluated mesh'''
+    mesh, stats = planar_decimate(obj, depsgraph, tolerance)
+    stats['applied'] = stats['watertight_after'] or (not stats['watertight_before'])
+    if not stats['applied']:
+        # never export a model that has been opened up by the simplification
+        bpy.data.meshes.remove(mesh)
+        return stats
+    old_mesh = obj.data
+    obj.modifiers.clear()
+    obj.data = mesh
+    if old_mesh.users == 0:
+        bpy.data.meshes.remove(old_mesh)
+    return stats
+
+
+def format_stats(stats):
+    if not stats.get('applied', True):
+        return 'Decimation skipped, the simplified mesh was not watertight'
+    return (
+        'Decimated to {triangles_after} triangles from {triangles_before} '
+        '(STL {stl_mb_after:.1f} MB from {stl_mb_before:.1f} MB)'
+    ).format(**stats)
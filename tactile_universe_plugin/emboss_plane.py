@@ -1,9 +1,25 @@
 import bpy
 import bmesh
+import json
 import math
 import os
+import time
+import numpy as np
 from mathutils import Vector, Euler
-from bpy.props import FloatProperty, EnumProperty, BoolProperty, StringProperty
+from bpy.props import FloatProperty, IntProperty, EnumProperty, BoolProperty, StringProperty
+from . import timing
+from . import mesh_budget
+from . import heightmap
+from . import rtin
+from . import geometry_nodes
+
+
+def grid_topology(nx, ny):
+    '''The (u, v) coordinates of the points and the loops of the quads of a grid with `nx` by `ny` cuts'''
+    u, v = np.meshgrid(np.linspace(0, 1, nx + 2), np.linspace(0, 1, ny + 2))
+    index = np.arange((nx + 2) * (ny + 2)).reshape(ny + 2, nx + 2)
+    loops = np.stack([index[:-1, :-1], index[:-1, 1:], index[1:, 1:], index[1:, :-1]], axis=-1)
+    return u.ravel(), v.ravel(), loops.ravel()
 
 
 class EmbossPlane(bpy.types.Operator):
@@ -19,6 +35,52 @@ class EmbossPlane(bpy.types.Operator):
         min=0,
         description='Number of faces per unit length across the top of the plane'
     )
+    Triangle_budget: IntProperty(
+        name='Triangle Budget',
+        default=0,
+        min=0,
+        description='If set, use the largest grid whose exported triangle count fits this budget instead of Faces Per Unit'
+    )
+    Stl_budget: FloatProperty(
+        name='STL Budget (MB)',
+        default=0,
+        min=0,
+        description='If set, use the largest grid whose STL file fits this size in MB instead of Faces Per Unit'
+    )
+    Mesh_type: EnumProperty(
+        name='Mesh Type',
+        description='How the top of the plane is divided into faces',
+        default='UNIFORM',
+        items=[
+            ('UNIFORM', 'uniform', 'Evenly spaced grid of faces'),
+            ('ADAPTIVE', 'adaptive', 'Triangles that are only as small as the detail in the image needs (at most Faces Per Unit)')
+        ]
+    )
+    Adaptive_error: FloatProperty(
+        name='Adaptive Error',
+        default=0.05,
+        min=0,
+        unit='LENGTH',
+        description='The largest height error allowed when merging faces of the adaptive mesh'
+    )
+    Bottom_type: EnumProperty(
+        name='Bottom Type',
+        description='How the flat bottom of the model is closed',
+        default='CAP',
+        items=[
+            ('CAP', 'cap', 'A single face (fewest triangles)'),
+            ('GRID', 'grid', 'A grid of faces matching the top (uniform mesh only)')
+        ]
+    )
+    Engine: EnumProperty(
+        name='Engine',
+        description='How the image is embossed into the mesh and the surface smoothed',
+        default='MODIFIERS',
+        items=[
+            ('MODIFIERS', 'modifiers', 'Displace and subdivision surface modifiers'),
+            ('GEOMETRY_NODES', 'geometry nodes', 'A geometry nodes group doing the same work (multithreaded)')
+        ]
+    )
     Emboss_height: FloatProperty(
         name='Emboss Thickness',
         default=3,
@@ -77,7 +139,51 @@ class EmbossPlane(bpy.types.Operator):
         name='Noise Filter Size',
         default=1,
         min=1,
-        description='Smooth out noise in the image'
+        description='Smooth out noise in the image, the width of the filter in pixels (1 for no filter)'
+    )
+    Noise_kernel: EnumProperty(
+        name='Noise Filter',
+        description='Filter used to remove noise from the image',
+        default='MEDIAN',
+        items=[
+            ('MEDIAN', 'median', 'Median of the pixels in a square box'),
+            ('GAUSSIAN', 'gaussian', 'Gaussian blur with a full width at half maximum of the filter size')
+        ]
+    )
+    Image_pyramid: BoolProperty(
+        name='Image Pyramid',
+        default=True,
+        description='Emboss with a copy of the image shrunk (by averaging pixels) to about the spacing of the grid'
+    )
+    Image_smoothing: EnumProperty(
+        name='Image Smoothing',
+        description='Filter used to smooth the image before it is used to emboss the plane',
+        default='NONE',
+        items=[
+            ('NONE', 'none', 'Use the image as it is'),
+            ('GAUSSIAN', 'gaussian', 'Gaussian blur'),
+            ('BILATERAL', 'bilateral', 'Blur that keeps sharp edges in the image')
+        ]
+    )
+    Smoothing_size: FloatProperty(
+        name='Smoothing Size',
+        default=1,
+        min=0,
+        unit='LENGTH',
+        description='Width (sigma) of the image smoothing filter on the model'
+    )
+    Smoothing_range: FloatProperty(
+        name='Smoothing Range',
+        default=0.1,
+        min=0.001,
+        description='Only pixels within about this difference in brightness are averaged by the bilateral filter'
+    )
+    Subsurf_levels: IntProperty(
+        name='Subdivision Levels',
+        default=2,
+        min=0,
+        max=6,
+        description='Levels of subdivision used to smooth the surface (each level multiplies the exported faces by 4)'
     )
     Spike_removal: BoolProperty(
         name='Spike Removal',
@@ -97,6 +203,11 @@ class EmbossPlane(bpy.types.Operator):
         min=0,
         description='Identified spikes will have their hight lowered by this fraction'
     )
+    Sub_objects: BoolProperty(
+        name='Make Sub-objects',
+        default=True,
+        description='Make the wedge, name plate and back frame (turn off to keep the ones from an earlier run, e.g. when re-making the emboss at another resolution)'
+    )
     Name_plate: BoolProperty(
         name='Make Name Plate',
         default=False,
@@ -130,6 +241,31 @@ class EmbossPlane(bpy.types.Operator):
         row.label(text='Faces Per Unit')
         row.prop(self, 'Fpu', text='')
 
+        row = box1.row()
+        row.label(text='Triangle Budget')
+        row.prop(self, 'Triangle_budget', text='')
+
+        row = box1.row()
+        row.label(text='STL Budget (MB)')
+        row.prop(self, 'Stl_budget', text='')
+
+        row = box1.row()
+        row.label(text='Mesh Type')
+        row.prop(self, 'Mesh_type', text='')
+
+        row = box1.row()
+        row.enabled = self.Mesh_type == 'ADAPTIVE'
+        row.label(text='Adaptive Error')
+        row.prop(self, 'Adaptive_error', text='')
+
+        row = box1.row()
+        row.label(text='Bottom Type')
+        row.prop(self, 'Bottom_type', text='')
+
+        row = box1.row()
+        row.label(text='Engine')
+        row.prop(self, 'Engine', text='')
+
         row = box1.row()
         row.label(text='Emboss Thickness')
         row.prop(self, 'Emboss_height', text='')
@@ -166,6 +302,33 @@ class EmbossPlane(bpy.types.Operator):
         row.label(text='Noise Filter Size')
         row.prop(self, 'Noise_filter', text='')
 
+        row = box2.row()
+        row.enabled = self.Noise_filter > 1
+        row.label(text='Noise Filter')
+        row.prop(self, 'Noise_kernel', text='')
+
+        row = box2.row()
+        row.label(text='Image Pyramid')
+        row.prop(self, 'Image_pyramid', text='')
+
+        row = box2.row()
+        row.label(text='Image Smoothing')
+        row.prop(self, 'Image_smoothing', text='')
+
+        row = box2.row()
+        row.enabled = self.Image_smoothing != 'NONE'
+        row.label(text='Smoothing Size')
+        row.prop(self, 'Smoothing_size', text='')
+
+        row = box2.row()
+        row.enabled = self.Image_smoothing == 'BILATERAL'
+        row.label(text='Smoothing Range')
+        row.prop(self, 'Smoothing_range', text='')
+
+        row = box2.row()
+        row.label(text='Subdivision Levels')
+        row.prop(self, 'Subsurf_levels', text='')
+
         row = box2.row()
         row.label(text='Spike Removal')
         row.prop(self, 'Spike_removal', text='')
@@ -183,6 +346,10 @@ class EmbossPlane(bpy.types.Operator):
         box3 = layout.box()
         box3.label(text='Name Plate Properties')
 
+        row = box3.row()
+        row.label(text='Make Sub-objects')
+        row.prop(self, 'Sub_objects', text='')
+
         row = box3.row()
         row.label(text='Make Name Plate')
         row.prop(self, 'Name_plate', text='')
@@ -344,6 +511,7 @@ class EmbossPlane(bpy.types.Operator):
             (2 + 8, 3 + 8, 7 + 8, 6 + 8)
         ]
         me = bpy.data.meshes.new('{0}_wedge'.format(self.object.name))
+        me['tu_made'] = True
         self.wedge = bpy.data.objects.new('{0}_wedge'.format(self.object.name), me)
         self.collection.objects.link(self.wedge)
         me.from_pydata(verts, [], faces)
@@ -477,40 +645,159 @@ class EmbossPlane(bpy.types.Operator):
         elif self.External_edge == 'BOTTOM':
             self.External_my = True
 
-    def get_weight(
-        self,
-        vert,
-        object_location,
-        lx,
-        ly,
-        Border_width,
-        External_y,
-        External_my,
-        External_x,
-        External_mx
-    ):
-        # Pass all arguments by value since this is called a
-        # large number of times and Blender's self.__getattribute__
-        # very slow (saves 50% compute time doing it this way)
-        x, y, _ = vert.co
-        x0, y0, _ = object_location
-        x = x + x0
-        y = y + y0
-        x2 = x0 + (0.5 * lx)
-        x1 = x2 - Border_width
-        y2 = y0 + (0.5 * ly)
-        y1 = y2 - Border_width
-        xm2 = x0 - (0.5 * lx)
-        xm1 = xm2 + Border_width
-        ym2 = y0 - (0.5 * ly)
-        ym1 = ym2 + Border_width
-        if (not External_y and (y > y1)) or \
-           (not External_my and (y < ym1)) or \
-           (not External_x and (x > x1)) or \
-           (not External_mx and (x < xm1)):
-            return 0
+    def get_weights(self, x, y):
+        '''The `emboss` weight (0 on the border, 1 inside) for arrays of x and y coordinates from the centre of the
+        plane'''
+        x1 = (0.5 * self.lx) - self.Border_width
+        y1 = (0.5 * self.ly) - self.Border_width
+        border = np.zeros(np.shape(x), dtype=bool)
+        if not self.External_y:
+            border |= y > y1
+        if not self.External_my:
+            border |= y < -y1
+        if not self.External_x:
+            border |= x > x1
+        if not self.External_mx:
+            border |= x < -x1
+        return np.where(border, 0.0, 1.0)
+
+    def get_image(self, obj):
+        # an image set on the object (e.g. by a script) takes priority
+        image_name = obj.get('TU_image')
+        if (image_name is not None) and (image_name in bpy.data.images):
+            return bpy.data.images[image_name]
+        # then the image used by the plane's material
+        material = obj.active_material
+        if (material is not None) and material.use_nodes:
+            for node in material.node_tree.nodes:
+                if (node.type == 'TEX_IMAGE') and (node.image is not None):
+                    return node.image
+        name = obj.name
+        image_match = [k for k in bpy.data.images.keys() if name.startswith(os.path.splitext(k)[0])]
+        if len(image_match) > 0:
+            return bpy.data.images[image_match[0]]  # assume last image loaded is the correct one
+        self.report({'INFO'}, "Can't find image matching object name, defaulting to first image")
+        return bpy.data.images[0]
+
+    def get_displacement_image(self, obj, nx):
+        image = self.get_image(obj)
+        # the filtered images are cached so re-running on the same image skips the filters
+        if self.Noise_filter > 1:
+            if self.Noise_kernel == 'MEDIAN':
+                size = int(self.Noise_filter)
+                image = heightmap.derived_image(
+                    image,
+                    'median{0}'.format(size),
+                    lambda data: heightmap.median_filter(data, size)
+                )
+            else:
+                sigma = self.Noise_filter / (2 * math.sqrt(2 * math.log(2)))
+                image = heightmap.derived_image(
+                    image,
+                    'denoise{0:.3g}'.format(sigma),
+                    lambda data: heightmap.gaussian_filter(data, sigma)
+                )
+        if self.Image_pyramid:
+            # large images are only sampled at the grid points, so average them down to the grid spacing
+            level = heightmap.pyramid_level(self.lx / (nx + 1), self.lx / image.size[0])
+            image = heightmap.pyramid_image(image, level)
+        if self.Image_smoothing == 'NONE':
+            return image
+        # the smoothing size is set in mm on the model
+        sigma = self.Smoothing_size * image.size[0] / self.lx
+        if self.Image_smoothing == 'GAUSSIAN':
+            return heightmap.derived_image(
+                image,
+                'gaussian{0:.3g}'.format(sigma),
+                lambda data: heightmap.gaussian_filter(data, sigma)
+            )
+        sigma_range = self.Smoothing_range
+        return heightmap.derived_image(
+            image,
+            'bilateral{0:.3g}_{1:.3g}'.format(sigma, sigma_range),
+            lambda data: heightmap.bilateral_filter(data, sigma, sigma_range)
+        )
+
+    def make_adaptive_grid(self, nx, ny):
+        # the finest grid matches the uniform grid along the longest side
+        tile = 2**math.ceil(math.log2(max(nx, ny, 1) + 1))
+        uv = np.linspace(0, 1, tile + 1)
+        u, v = np.meshgrid(uv, uv)
+        x = (u - 0.5) * self.lx
+        y = (v - 0.5) * self.ly
+        # only the embossed area can add detail, so the border and external edges are refined where the height steps
+        heights = heightmap.sample_bilinear(heightmap.image_to_array(self.image), u, v)
+        # the same displacement as the `bump` modifier, (intensity - mid level) * strength
+        invert_multiplyer = -1 if self.Invert_image else 1
+        heights = (heights - invert_multiplyer) * self.Emboss_height * invert_multiplyer * self.get_weights(x, y)
+        points, triangles = rtin.build(heights, self.Adaptive_error)
+        point_u = uv[points[:, 0]]
+        point_v = uv[points[:, 1]]
+
+        bm = self.get_bm()
+        bm.clear()
+        uv_layer = bm.loops.layers.uv.verify()
+        verts = [
+            bm.verts.new((self.center[0] + (pu - 0.5) * self.lx, self.center[1] + (pv - 0.5) * self.ly, 0))
+            for pu, pv in zip(point_u, point_v)
+        ]
+        for triangle in triangles:
+            face = bm.faces.new([verts[i] for i in triangle])
+            for loop, i in zip(face.loops, triangle):
+                loop[uv_layer].uv = (point_u[i], point_v[i])
+        bm.verts.index_update()
+        bm.edges.index_update()
+        bm.faces.index_update()
+        bm.normal_update()
+        bmesh.update_edit_mesh(self.object.data)
+        self.report({'INFO'}, '{0} adaptive faces ({1:.1%} of the uniform grid)'.format(
+            len(triangles),
+            len(triangles) / (2 * tile**2)
+        ))
+
+    def make_solid(self, bm):
+        '''Add side walls below the boundary of the top surface and close the bottom, returns the new vertices'''
+        depth = Vector((0, 0, -(self.Emboss_height + self.Base_height)))
+        # adding a layer invalidates the edges already looked up, so do it first
+        crease = bm.edges.layers.float.get('crease_edge') or bm.edges.layers.float.new('crease_edge')
+        # walk around the boundary in the same direction as the faces that use it
+        next_vert = {}
+        top_edges = []
+        for e in bm.edges:
+            if e.is_boundary:
+                loop = e.link_loops[0]
+                next_vert[loop.vert] = loop.link_loop_next.vert
+                top_edges.append(e)
+        start = next(iter(next_vert))
+        ring = [start]
+        while next_vert[ring[-1]] != start:
+            ring.append(next_vert[ring[-1]])
+        bottom = [bm.verts.new(v.co + depth) for v in ring]
+        n = len(ring)
+        for i in range(n):
+            j = (i + 1) % n
+            bm.faces.new((ring[j], ring[i], bottom[i], bottom[j]))
+        bottom_edges = [bm.edges.get((bottom[i], bottom[(i + 1) % n])) for i in range(n)]
+        new_verts = list(bottom)
+        if (self.Bottom_type == 'GRID') and (self.Mesh_type == 'UNIFORM'):
+            # `grid_fill` needs two opposite rails of the ring (the front and back sides), the other two sides
+            # join their ends
+            y_min = min(v.co.y for v in bottom)
+            y_max = max(v.co.y for v in bottom)
+            rails = [
+                e for e in bottom_edges
+                if all(abs(v.co.y - y_min) < 1e-6 for v in e.verts) or all(abs(v.co.y - y_max) < 1e-6 for v in e.verts)
+            ]
+            faces = bmesh.ops.grid_fill(bm, edges=rails)['faces']
+            new_verts += list({v for f in faces for v in f.verts if v not in bottom})
+            bmesh.ops.recalc_face_normals(bm, faces=bm.faces[:])
         else:
-            return 1
+            # the bottom is flat, so a single face (facing down) is enough
+            bm.faces.new(list(reversed(bottom)))
+        # keep the top and bottom edges sharp when the surface is smoothed
+        for e in top_edges + bottom_edges:
+            e[crease] = 1
+        return new_verts
 
     def flatten_spikes(
         self,
@@ -524,7 +811,9 @@ class EmbossPlane(bpy.types.Operator):
         depsgraph = context.evaluated_depsgraph_get()
         object_mod = self.object.evaluated_get(depsgraph)
         bm_mod = bmesh.new()
-        bm_mod.from_mesh(bpy.data.meshes.new_from_object(object_mod))
+        # `to_mesh` is freed with `to_mesh_clear` so no mesh is left behind in bpy.data
+        bm_mod.from_mesh(object_mod.to_mesh())
+        object_mod.to_mesh_clear()
         bm_mod.verts.ensure_lookup_table()
 
         # loop over emboss group looking for spikes
@@ -549,198 +838,254 @@ class EmbossPlane(bpy.types.Operator):
                     v.co.z += Spike_reduction_factor * average_dif
                 else:
                     v.co.z -= Spike_reduction_factor * average_dif
+        bm_mod.free()
         self.object.data.update()
 
+    def get_size(self, obj):
+        '''The centre and (x, y) size of a plane from the bounds of its vertices'''
+        co = np.empty(len(obj.data.vertices) * 3)
+        obj.data.vertices.foreach_get('co', co)
+        co = co.reshape(-1, 3)[:, :2]
+        low = co.min(axis=0)
+        high = co.max(axis=0)
+        return 0.5 * (low + high), high - low
+
+    def make_uniform_grid(self, obj, center, size, grid):
+        u, v, loops = grid
+        mesh = obj.data
+        mesh.clear_geometry()
+        mesh.vertices.add(len(u))
+        mesh.loops.add(len(loops))
+        mesh.polygons.add(len(loops) // 4)
+        co = np.zeros((len(u), 3))
+        co[:, 0] = center[0] + (u - 0.5) * size[0]
+        co[:, 1] = center[1] + (v - 0.5) * size[1]
+        mesh.vertices.foreach_set('co', co.ravel())
+        mesh.loops.foreach_set('vertex_index', loops)
+        mesh.polygons.foreach_set('loop_start', np.arange(0, len(loops), 4))
+        uv_layer = mesh.uv_layers.active or mesh.uv_layers.new(name='UVMap')
+        uv_layer.data.foreach_set('uv', np.stack([u[loops], v[loops]], axis=-1).ravel())
+        mesh.update(calc_edges=True)
+
     def execute(self, context):
+        start = time.perf_counter()
+        objects = [context.active_object]
+        objects += [obj for obj in context.objects_in_mode if (obj.type == 'MESH') and (obj != context.active_object)]
+        self.update_external()
+
+        # size up every plane and make the grids (with the data API) out of edit mode
+        bpy.ops.object.mode_set(mode='OBJECT')
+        grids = {}
+        planes = []
+        for obj in objects:
+            timer = timing.StageTimer(obj.name)
+            center, (lx, ly) = self.get_size(obj)
+
+            # get number of cuts to make
+            budget_keywords = {
+                'Fpu': self.Fpu,
+                'Triangle_budget': self.Triangle_budget,
+                'Stl_budget': self.Stl_budget,
+                'External_edge': self.External_edge,
+                'Back_frame': self.Back_frame,
+                'Name_plate': self.Name_plate,
+                'Name_plate_text': self.Name_plate_text,
+                'Spike_removal': self.Spike_removal,
+                'Subsurf_levels': self.Subsurf_levels,
+                'Bottom_type': self.Bottom_type
+            }
+            fpu = mesh_budget.choose_fpu(lx, ly, budget_keywords)
+            if fpu is None:
+                self.report({'ERROR'}, '{0}: no grid fits the triangle/STL budget'.format(obj.name))
+                continue
+            nx, ny = mesh_budget.grid_cuts(lx, ly, fpu)
+            if len(mesh_budget.target_budget(budget_keywords)) > 0:
+                estimate = mesh_budget.estimate_model(lx, ly, dict(budget_keywords, Fpu=fpu))
+                self.report({'INFO'}, '{0} budget: {1}'.format(obj.name, mesh_budget.format_estimate(estimate)))
+            self.report({'INFO'}, '{0}: {1} total faces'.format(obj.name, nx * ny))
+
+            if self.Mesh_type == 'UNIFORM':
+                with timer.stage('uniform', obj):
+                    # planes with the same number of cuts share the grid topology
+                    if (nx, ny) not in grids:
+                        grids[(nx, ny)] = grid_topology(nx, ny)
+                    self.make_uniform_grid(obj, center, (lx, ly), grids[(nx, ny)])
+            planes.append((obj, center, lx, ly, nx, ny, timer))
+        bpy.ops.object.mode_set(mode='EDIT')
+
+        for obj, self.center, self.lx, self.ly, nx, ny, self.timer in planes:
+            self.emboss_object(context, obj, nx, ny)
+        if len(planes) == 0:
+            return {'CANCELLED'}
+        if len(objects) > 1:
+            self.report({'INFO'}, 'Embossed {0} planes in {1:.2f}s'.format(len(planes), time.perf_counter() - start))
+        return {'FINISHED'}
+
+    def emboss_object(self, context, obj, nx, ny):
         self.emboss_objects = {}
-        self.object = context.active_object
+        self.object = obj
         name = self.object.name
         rotation = self.object.rotation_euler.copy()
         self.object.rotation_euler = Euler((0, 0, 0))
-        # self.object = bpy.data.objects[name]
         if len(self.object.users_collection) > 0:
             self.collection = self.object.users_collection[0]
         else:
             self.collection = bpy.context.scene.collection
-        self.update_external()
-
-        # get object
-        bm = self.get_bm()
-
-        # get length and width
-        self.ly = bm.edges[0].calc_length()
-        self.lx = bm.edges[1].calc_length()
-
-        # get number of cuts to make
-        B = self.lx * self.ly * self.Fpu**2
-        A = self.ly / self.lx
-        nx = round(math.sqrt(A * B)) - 1
-        ny = round(math.sqrt(B / A)) - 1
-        self.report({'INFO'}, '{0} total faces'.format(nx * ny))
+        bpy.ops.mesh.select_all(action='DESELECT')
 
         # get location and rotation of all added meshes
         self.get_loc_rot()
 
-        # make loop cuts
-        areas3D = [area for area in context.window.screen.areas if area.type == 'VIEW_3D']
-        region = [region for region in areas3D[0].regions if region.type == 'WINDOW']
-        for r in region:
-            override = {
-                'window': context.window,
-                'screen': context.window.screen,
-                'area': areas3D[0],
-                'region': r,
-                'scene': context.scene
-            }
-            try:
-                with bpy.context.temp_override(**override):
-                    bpy.ops.mesh.loopcut(
-                        number_cuts=nx,
-                        object_index=self.object.pass_index,
-                        edge_index=0
-                    )
-                    bpy.ops.mesh.loopcut(
-                        number_cuts=ny,
-                        object_index=self.object.pass_index,
-                        edge_index=1
-                    )
-                break
-            except RuntimeError:
-                continue
-
-        bpy.ops.mesh.select_all(action='DESELECT')
-
-        # make vertex groups
-        if 'emboss' not in self.object.vertex_groups.keys():
-            self.object.vertex_groups.new(name='emboss')
-
-        # apply weights
-        weight_args = (
-            self.object.location,
-            self.lx,
-            self.ly,
-            self.Border_width,
-            self.External_y,
-            self.External_my,
-            self.External_x,
-            self.External_mx
-        )
-        bm = self.get_bm()
-        bm.verts.layers.deform.verify()
-        deform = bm.verts.layers.deform.active
-        self.verts_1 = []
-        for v in bm.verts:
-            w = self.get_weight(v, *weight_args)
-            v[deform][0] = w
-            if w == 1:
-                self.verts_1.append(v.index)
-
-        # Extrude down and close bottom
-        extrude_normal = bm.verts[0].normal * -1 * (self.Emboss_height + self.Base_height)
-        bound_edges = [e for e in bm.edges if e.is_boundary]
-        bound_edges_index = [e.index for e in bound_edges]
-        bmesh.ops.extrude_edge_only(bm, edges=bound_edges)
-        bm = self.get_bm()
-        bound_verts = [v for v in bm.verts if v.is_boundary]
-        bound_verts_index = [v.index for v in bound_verts]
-        bound_edges = [e for e in bm.edges if e.is_boundary]
-        bound_edges_index += [e.index for e in bound_edges]
-        bmesh.ops.translate(bm, vec=extrude_normal, verts=bound_verts)
-        bpy.ops.mesh.select_all(action='DESELECT')
-        for e in bound_edges:
-            e.select = True
-        bpy.ops.mesh.fill_grid()
-        bottom_face_verts_index = [v.index for v in bm.verts if v.select]
-        bpy.ops.mesh.select_all(action='DESELECT')
-
-        # set vertex group values
-        bm = self.get_bm()
-        bm.verts.layers.deform.verify()
-        deform = bm.verts.layers.deform.active
-        for v_index in bottom_face_verts_index + bound_verts_index:
-            bm.verts[v_index][deform][0] = 0
-
-        # set crease on boundary
-        for e_index in bound_edges_index:
-            bm.edges[e_index].select = True
-        bpy.ops.transform.edge_crease(value=1)
-
-        # add modifiers
-        invert_multiplyer = 1
-        if self.Invert_image:
-            invert_multiplyer = -1
-        tex = bpy.data.textures.keys()
-        mod = self.object.modifiers.keys()
-        displacement_name = '_'.join(['Displacement', name])
-        if displacement_name not in tex:
-            iTex = bpy.data.textures.new(displacement_name, type='IMAGE')
-        else:
-            iTex = bpy.data.textures[displacement_name]
-        image_match = [k for k in bpy.data.images.keys() if name.startswith(os.path.splitext(k)[0])]
-        if len(image_match) > 0:
-            iTex.image = bpy.data.images[image_match[0]]  # assume last image loaded is the correct one
-        else:
-            self.report({'INFO'}, "Can't find image matching object name, defaulting to first image")
-            iTex.image = bpy.data.images[0]
-        iTex.filter_size = self.Noise_filter
-        if 'bump' not in mod:
-            displace = self.object.modifiers.new(name='bump', type='DISPLACE')
-            displace.texture = iTex
-            displace.direction = 'Z'
-            displace.vertex_group = 'emboss'
-            displace.texture_coords = 'UV'
-            displace.show_in_editmode = True
-            displace.show_on_cage = True
-        else:
-            displace = self.object.modifiers['bump']
-        displace.strength = self.Emboss_height * invert_multiplyer
-        displace.mid_level = 1 * invert_multiplyer
+        # find (and filter) the image used for the emboss
+        with self.timer.stage('image'):
+            self.image = self.get_displacement_image(self.object, nx)
+
+        if self.Mesh_type == 'ADAPTIVE':
+            with self.timer.stage('adaptive', self.object):
+                self.make_adaptive_grid(nx, ny)
+
+        with self.timer.stage('weights', self.object):
+            # make vertex groups
+            if 'emboss' not in self.object.vertex_groups.keys():
+                self.object.vertex_groups.new(name='emboss')
+
+            # apply weights
+            bm = self.get_bm()
+            bm.verts.layers.deform.verify()
+            deform = bm.verts.layers.deform.active
+            co = np.array([v.co.xy for v in bm.verts]).reshape(-1, 2)
+            weights = self.get_weights(co[:, 0] - self.center[0], co[:, 1] - self.center[1])
+            for v, w in zip(bm.verts, weights.tolist()):
+                v[deform][0] = w
+            self.verts_1 = np.flatnonzero(weights == 1).tolist()
+
+        with self.timer.stage('extrude', self.object):
+            # build the side walls and close the bottom
+            bottom_verts = self.make_solid(bm)
+
+            # set vertex group values
+            deform = bm.verts.layers.deform.active
+            for v in bottom_verts:
+                v[deform][0] = 0
+            bm.verts.index_update()
+            bm.edges.index_update()
+            bm.faces.index_update()
+            bmesh.update_edit_mesh(self.object.data)
+
+        with self.timer.stage('displace'):
+            # add modifiers
+            invert_multiplyer = 1
+            if self.Invert_image:
+                invert_multiplyer = -1
+            mod = self.object.modifiers.keys()
+            if self.Engine == 'GEOMETRY_NODES':
+                for modifier_name in ['bump', 'smooth']:
+                    if modifier_name in mod:
+                        self.object.modifiers.remove(self.object.modifiers[modifier_name])
+                mod = self.object.modifiers.keys()
+                image = self.image
+                if not image.is_float:
+                    # the nodes read colour managed values, so they are given the raw intensity the DISPLACE
+                    # modifier uses as a (linear) float image
+                    image = heightmap.derived_image(image, 'intensity', lambda data: data)
+                nodes = geometry_nodes.emboss_modifier(self.object)
+                geometry_nodes.set_inputs(
+                    nodes,
+                    **{
+                        'Image': image,
+                        'Strength': self.Emboss_height * invert_multiplyer,
+                        'Mid Level': 1 * invert_multiplyer,
+                        # smoothed at the end (after any spikes are found on the unsmoothed mesh)
+                        'Subsurf Levels': 0
+                    }
+                )
+            else:
+                if geometry_nodes.MODIFIER_NAME in mod:
+                    self.object.modifiers.remove(self.object.modifiers[geometry_nodes.MODIFIER_NAME])
+                    mod = self.object.modifiers.keys()
+                tex = bpy.data.textures.keys()
+                displacement_name = '_'.join(['Displacement', name])
+                if displacement_name not in tex:
+                    iTex = bpy.data.textures.new(displacement_name, type='IMAGE')
+                    iTex['tu_made'] = True
+                else:
+                    iTex = bpy.data.textures[displacement_name]
+                iTex.image = self.image
+                # the noise is filtered out of the image itself
+                iTex.filter_size = 1
+                if 'bump' not in mod:
+                    displace = self.object.modifiers.new(name='bump', type='DISPLACE')
+                    displace.texture = iTex
+                    displace.direction = 'Z'
+                    displace.vertex_group = 'emboss'
+                    displace.texture_coords = 'UV'
+                    displace.show_in_editmode = True
+                    displace.show_on_cage = True
+                else:
+                    displace = self.object.modifiers['bump']
+                displace.strength = self.Emboss_height * invert_multiplyer
+                displace.mid_level = 1 * invert_multiplyer
 
-        # Deselect all verts
-        bpy.ops.mesh.select_all(action='DESELECT')
+            # Deselect all verts
+            bpy.ops.mesh.select_all(action='DESELECT')
 
         # Spike removal
         if self.Spike_removal:
-            # for spike removal temp remove the smoothing modifier
-            if 'smooth' in mod:
-                subsurf = self.object.modifiers['smooth']
-                self.object.modifiers.remove(subsurf)
-            self.flatten_spikes(
-                context,
-                self.Spike_threshold,
-                self.Spike_reduction_factor,
-                self.Invert_image
-            )
-
-        # if external or name plate edge create wedge and edge/name plate
-        if self.External_edge != 'NONE':
-            self.make_wedge()
-            self.make_external_edge()
-        else:
-            self.remove_external_object('{0}_wedge'.format(self.object.name))
-            _ = self.emboss_objects.pop('wedge', None)
-            if self.Name_plate:
-                self.make_internal_name_plate()
-            else:
-                self.remove_external_object('{0}_Plate'.format(self.object.name))
-                self.remove_external_object('{0}_FontObject'.format(self.object.name))
-                _ = self.emboss_objects.pop('name_plate', None)
-                _ = self.emboss_objects.pop('name_font', None)
-
-        if self.Back_frame:
-            self.make_back_frame()
-        else:
-            self.remove_external_object('{0}_BackFrameObject'.format(self.object.name))
-            self.remove_external_object('{0}_PlateBackFrameObject'.format(self.object.name))
-            _ = self.emboss_objects.pop('back_frame', None)
-            _ = self.emboss_objects.pop('back_frame_name_plate', None)
+            with self.timer.stage('spikes'):
+                # for spike removal temp remove the smoothing modifier
+                if 'smooth' in mod:
+                    subsurf = self.object.modifiers['smooth']
+                    self.object.modifiers.remove(subsurf)
+                self.flatten_spikes(
+                    context,
+                    self.Spike_threshold,
+                    self.Spike_reduction_factor,
+                    self.Invert_image
+                )
+
+        # the sub-objects are left as they are when only the emboss is re-made
+        if self.Sub_objects:
+            # if external or name plate edge create wedge and edge/name plate
+            with self.timer.stage('name_plate'):
+                if self.External_edge != 'NONE':
+                    self.make_wedge()
+                    self.make_external_edge()
+                else:
+                    self.remove_external_object('{0}_wedge'.format(self.object.name))
+                    _ = self.emboss_objects.pop('wedge', None)
+                    if self.Name_plate:
+                        self.make_internal_name_plate()
+                    else:
+                        self.remove_external_object('{0}_Plate'.format(self.object.name))
+                        self.remove_external_object('{0}_FontObject'.format(self.object.name))
+                        _ = self.emboss_objects.pop('name_plate', None)
+                        _ = self.emboss_objects.pop('name_font', None)
+
+            with self.timer.stage('back_frame'):
+                if self.Back_frame:
+                    self.make_back_frame()
+                else:
+                    self.remove_external_object('{0}_BackFrameObject'.format(self.object.name))
+                    self.remove_external_object('{0}_PlateBackFrameObject'.format(self.object.name))
+                    _ = self.emboss_objects.pop('back_frame', None)
+                    _ = self.emboss_objects.pop('back_frame_name_plate', None)
 
         # Smooth surface
-        if 'smooth' not in mod:
-            subsurf = self.object.modifiers.new(name='smooth', type='SUBSURF')
-            subsurf.quality = 1
-            subsurf.show_viewport = True
-            subsurf.levels = 2
+        if self.Engine == 'GEOMETRY_NODES':
+            geometry_nodes.set_inputs(
+                self.object.modifiers[geometry_nodes.MODIFIER_NAME],
+                **{'Subsurf Levels': self.Subsurf_levels}
+            )
+        elif self.Subsurf_levels > 0:
+            if 'smooth' not in self.object.modifiers.keys():
+                subsurf = self.object.modifiers.new(name='smooth', type='SUBSURF')
+                subsurf.quality = 1
+                subsurf.show_viewport = True
+            subsurf = self.object.modifiers['smooth']
+            subsurf.levels = self.Subsurf_levels
+            subsurf.render_levels = self.Subsurf_levels
+        elif 'smooth' in self.object.modifiers.keys():
+            self.object.modifiers.remove(self.object.modifiers['smooth'])
 
         # Parent objects
         if 'back_frame' in self.emboss_objects:
@@ -759,7 +1104,20 @@ class EmbossPlane(bpy.types.Operator):
                 self.emboss_objects['name_font'].parent = self.emboss_objects['name_plate']
                 self.emboss_objects['name_font'].matrix_parent_inverse = self.emboss_objects['name_plate'].matrix_world.inverted()
         self.object.rotation_euler = rotation
-        return {'FINISHED'}
+
+        # keep the part names with the object so scripts can export them without searching the scene
+        parts = {'model': self.object.name}
+        if self.Sub_objects:
+            parts.update({key: part.name for key, part in self.emboss_objects.items()})
+        elif 'TU_parts' in self.object:
+            kept = json.loads(self.object['TU_parts'])
+            parts.update({key: part for key, part in kept.items() if part in bpy.data.objects})
+            parts['model'] = self.object.name
+        self.object['TU_parts'] = json.dumps(parts)
+
+        # keep the timings with the object so scripts can write them out
+        self.object['TU_timing'] = self.timer.to_json()
+        self.report({'INFO'}, self.timer.summary())
 
     @classmethod
     def poll(cls, context):
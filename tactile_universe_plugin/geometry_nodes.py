@@ -0,0 +1,124 @@
+import bpy
+
+GROUP_NAME = 'TU_emboss'
+# bump when the nodes change so node groups saved in older .blend files are rebuilt
+GROUP_VERSION = 1
+MODIFIER_NAME = 'emboss_nodes'
+
+
+def add_socket(group, name, in_out, socket_type, default=None):
+    socket = group.interface.new_socket(name, in_out=in_out, socket_type=socket_type)
+    if default is not None:
+        socket.default_value = default
+    return socket
+
+
+def vector_math(nodes, operation):
+    node = nodes.new('ShaderNodeVectorMath')
+    node.operation = operation
+    return node
+
+
+def math_node(nodes, operation):
+    node = nodes.new('ShaderNodeMath')
+    node.operation = operation
+    return node
+
+
+def named_attribute(nodes, name):
+    node = nodes.new('GeometryNodeInputNamedAttribute')
+    node.data_type = 'FLOAT'
+    node.inputs['Name'].default_value = name
+    return node
+
+
+def emboss_node_group():
+    '''The node group doing the work of the `bump` (DISPLACE) and `smooth` (SUBSURF) modifiers of `EmbossPlane`.
+    The image is sampled at the UV of each point (from its place in the bounds of the plane), offset in z by
+    `(intensity - Mid Level) * Strength` times the `emboss` vertex group and then subdivided, keeping the
+    `crease_edge` edges sharp'''
+    group = bpy.data.node_groups.get(GROUP_NAME)
+    if (group is not None) and (group.get('tu_version') == GROUP_VERSION):
+        return group
+    if group is None:
+        group = bpy.data.node_groups.new(GROUP_NAME, 'GeometryNodeTree')
+    group.interface.clear()
+    group.nodes.clear()
+    add_socket(group, 'Geometry', 'INPUT', 'NodeSocketGeometry')
+    add_socket(group, 'Image', 'INPUT', 'NodeSocketImage')
+    add_socket(group, 'Strength', 'INPUT', 'NodeSocketFloat', 1.0)
+    add_socket(group, 'Mid Level', 'INPUT', 'NodeSocketFloat', 1.0)
+    add_socket(group, 'Subsurf Levels', 'INPUT', 'NodeSocketInt', 2)
+    add_socket(group, 'Geometry', 'OUTPUT', 'NodeSocketGeometry')
+    nodes = group.nodes
+    links = group.links
+    group_in = nodes.new('NodeGroupInput')
+    group_out = nodes.new('NodeGroupOutput')
+
+    # UV of each point from its position in the bounds of the plane (the walls and bottom share the UV of the
+    # top surface above them, but have no weight)
+    position = nodes.new('GeometryNodeInputPosition')
+    bounds = nodes.new('GeometryNodeBoundBox')
+    links.new(group_in.outputs['Geometry'], bounds.inputs['Geometry'])
+    offset = vector_math(nodes, 'SUBTRACT')
+    links.new(position.outputs['Position'], offset.inputs[0])
+    links.new(bounds.outputs['Min'], offset.inputs[1])
+    size = vector_math(nodes, 'SUBTRACT')
+    links.new(bounds.outputs['Max'], size.inputs[0])
+    links.new(bounds.outputs['Min'], size.inputs[1])
+    uv = vector_math(nodes, 'DIVIDE')
+    links.new(offset.outputs['Vector'], uv.inputs[0])
+    links.new(size.outputs['Vector'], uv.inputs[1])
+
+    # intensity (mean of the RGB channels) of the image, the same value the DISPLACE modifier uses
+    texture = nodes.new('GeometryNodeImageTexture')
+    texture.interpolation = 'Linear'
+    texture.extension = 'EXTEND'
+    links.new(group_in.outputs['Image'], texture.inputs['Image'])
+    links.new(uv.outputs['Vector'], texture.inputs['Vector'])
+    intensity = vector_math(nodes, 'DOT_PRODUCT')
+    links.new(texture.outputs['Color'], intensity.inputs[0])
+    intensity.inputs[1].default_value = (1 / 3, 1 / 3, 1 / 3)
+
+    # (intensity - mid level) * strength * weight
+    height = math_node(nodes, 'SUBTRACT')
+    links.new(intensity.outputs['Value'], height.inputs[0])
+    links.new(group_in.outputs['Mid Level'], height.inputs[1])
+    strength = math_node(nodes, 'MULTIPLY')
+    links.new(height.outputs['Value'], strength.inputs[0])
+    links.new(group_in.outputs['Strength'], strength.inputs[1])
+    weighted = math_node(nodes, 'MULTIPLY')
+    links.new(strength.outputs['Value'], weighted.inputs[0])
+    links.new(named_attribute(nodes, 'emboss').outputs['Attribute'], weighted.inputs[1])
+    displacement = nodes.new('ShaderNodeCombineXYZ')
+    links.new(weighted.outputs['Value'], displacement.inputs['Z'])
+    set_position = nodes.new('GeometryNodeSetPosition')
+    links.new(group_in.outputs['Geometry'], set_position.inputs['Geometry'])
+    links.new(displacement.outputs['Vector'], set_position.inputs['Offset'])
+
+    subdivide = nodes.new('GeometryNodeSubdivisionSurface')
+    links.new(set_position.outputs['Geometry'], subdivide.inputs['Mesh'])
+    links.new(group_in.outputs['Subsurf Levels'], subdivide.inputs['Level'])
+    links.new(named_attribute(nodes, 'crease_edge').outputs['Attribute'], subdivide.inputs['Edge Crease'])
+    links.new(subdivide.outputs['Mesh'], group_out.inputs['Geometry'])
+    group['tu_version'] = GROUP_VERSION
+    return group
+
+
+def set_inputs(modifier, **values):
+    '''Set the inputs of a node group modifier by their names'''
+    for item in modifier.node_group.interface.items_tree:
+        if (item.item_type == 'SOCKET') and (item.in_out == 'INPUT') and (item.name in values):
+            modifier[item.identifier] = values[item.name]
+    modifier.node_group.interface_update(bpy.context)
+
+
+def emboss_modifier(obj):
+    '''The geometry nodes modifier of the emboss on `obj` (made if needed)'''
+    modifier = obj.modifiers.get(MODIFIER_NAME)
+    if modifier is None:
+        modifier = obj.modifiers.new(name=MODIFIER_NAME, type='NODES')
+        modifier.show_in_editmode = True
+        modifier.show_on_cage = True
+    modifier.node_group = emboss_node_group()
+    return modifier
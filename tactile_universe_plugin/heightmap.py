@@ -0,0 +1,149 @@
+import bpy
+import math
+import os
+import numpy as np
+
+
+def image_to_array(image):
+    '''The intensity (mean of the RGB channels) of an image as a 2D array, row 0 is the bottom of the image'''
+    width, height = image.size
+    pixels = np.empty(width * height * image.channels, dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    pixels = pixels.reshape(height, width, image.channels)
+    if image.channels >= 3:
+        return pixels[..., :3].mean(axis=-1)
+    return pixels[..., 0]
+
+
+def sample_bilinear(data, u, v):
+    '''Sample a 2D array at UV coordinates (in the range [0, 1]) with bilinear interpolation'''
+    height, width = data.shape
+    x = np.clip(u * width - 0.5, 0, width - 1)
+    y = np.clip(v * height - 0.5, 0, height - 1)
+    x0 = np.floor(x).astype(np.intp)
+    y0 = np.floor(y).astype(np.intp)
+    x1 = np.minimum(x0 + 1, width - 1)
+    y1 = np.minimum(y0 + 1, height - 1)
+    fx = x - x0
+    fy = y - y0
+    return (
+        data[y0, x0] * (1 - fx) * (1 - fy) +
+        data[y0, x1] * fx * (1 - fy) +
+        data[y1, x0] * (1 - fx) * fy +
+        data[y1, x1] * fx * fy
+    )
+
+
+def array_to_image(name, data):
+    '''Write a 2D array into a (float, grey scale) image, re-using the image if it already exists'''
+    height, width = data.shape
+    image = bpy.data.images.get(name)
+    if (image is None) or (tuple(image.size) != (width, height)):
+        if image is not None:
+            bpy.data.images.remove(image)
+        image = bpy.data.images.new(name, width=width, height=height, float_buffer=True)
+        image['tu_made'] = True
+    rgba = np.ones((height, width, 4), dtype=np.float32)
+    rgba[..., :3] = data[..., None]
+    image.pixels.foreach_set(rgba.ravel())
+    image.update()
+    # keep the pixels with the .blend file
+    image.pack()
+    return image
+
+
+def derived_image(image, key, filter_function):
+    '''`image` passed through `filter_function`, cached as an image named after the source and `key`'''
+    name = '{0}_{1}'.format(os.path.splitext(image.name)[0], key)
+    cached = bpy.data.images.get(name)
+    source = '{0} {1}x{2}'.format(image.name, *image.size)
+    if (cached is not None) and (cached.get('tu_source') == source) and (cached.get('tu_key') == key):
+        return cached
+    derived = array_to_image(name, filter_function(image_to_array(image)))
+    derived['tu_source'] = source
+    derived['tu_key'] = key
+    return derived
+
+
+def downsample(data):
+    '''Halve the size of a 2D array by averaging each 2 by 2 block (an odd last row or column is repeated)'''
+    height, width = data.shape
+    data = np.pad(data, [(0, height % 2), (0, width % 2)], mode='edge')
+    return 0.25 * (data[0::2, 0::2] + data[1::2, 0::2] + data[0::2, 1::2] + data[1::2, 1::2])
+
+
+def pyramid_level(spacing, pixel_size):
+    '''The number of times the image can be halved and still have at least one pixel every `spacing`'''
+    if pixel_size <= 0:
+        return 0
+    return max(int(math.floor(math.log2(spacing / pixel_size))), 0)
+
+
+def pyramid_image(image, level):
+    '''Level `level` of an area averaged image pyramid, each level is cached so it is only made once'''
+    for _ in range(level):
+        if min(image.size) <= 1:
+            break
+        image = derived_image(image, 'half', downsample)
+    return image
+
+
+def gaussian_kernel(sigma):
+    radius = max(int(math.ceil(3 * sigma)), 1)
+    offsets = np.arange(-radius, radius + 1)
+    kernel = np.exp(-0.5 * (offsets / sigma)**2)
+    return kernel / kernel.sum()
+
+
+def convolve_axis(data, kernel, axis):
+    radius = len(kernel) // 2
+    pad = [(0, 0), (0, 0)]
+    pad[axis] = (radius, radius)
+    padded = np.pad(data, pad, mode='edge')
+    out = np.zeros_like(data)
+    length = data.shape[axis]
+    for offset, weight in enumerate(kernel):
+        out += weight * np.take(padded, np.arange(offset, offset + length), axis=axis)
+    return out
+
+
+def gaussian_filter(data, sigma):
+    '''Separable gaussian blur (sigma in pixels)'''
+    if sigma <= 0:
+        return data
+    kernel = gaussian_kernel(sigma)
+    return convolve_axis(convolve_axis(data, kernel, 0), kernel, 1)
+
+
+def bilateral_filter(data, sigma, sigma_range):
+    '''Edge preserving blur, pixels only average with neighbours within about `sigma_range` of their own value'''
+    if sigma <= 0:
+        return data
+    radius = max(int(math.ceil(2 * sigma)), 1)
+    padded = np.pad(data, radius, mode='edge')
+    height, width = data.shape
+    total = np.zeros_like(data)
+    norm = np.zeros_like(data)
+    for dy in range(-radius, radius + 1):
+        for dx in range(-radius, radius + 1):
+            shifted = padded[radius + dy:radius + dy + height, radius + dx:radius + dx + width]
+            weight = np.exp(-0.5 * (dx**2 + dy**2) / sigma**2 - 0.5 * ((shifted - data) / sigma_range)**2)
+            total += weight * shifted
+            norm += weight
+    return total / norm
+
+
+def median_filter(data, size):
+    '''Median of the `size` by `size` pixels around each pixel (`size` is rounded up to an odd number)'''
+    radius = int(size) // 2
+    if radius < 1:
+        return data
+    window = 2 * radius + 1
+    padded = np.pad(data, radius, mode='edge')
+    windows = np.lib.stride_tricks.sliding_window_view(padded, (window, window))
+    out = np.empty_like(data)
+    # work through a block of rows at a time to limit the memory used
+    step = max(1, 2**22 // (data.shape[1] * window**2))
+    for start in range(0, data.shape[0], step):
+        out[start:start + step] = np.median(windows[start:start + step], axis=(2, 3))
+    return out
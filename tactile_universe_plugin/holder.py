@@ -104,6 +104,7 @@ class Holder(bpy.types.Operator):
             (2, 3, 7, 6)
         ]
         me = bpy.data.meshes.new(name_mesh)
+        me['tu_made'] = True
         rectangle = bpy.data.objects.new(name, me)
         bpy.context.scene.collection.objects.link(rectangle)
         me.from_pydata(verts, [], faces)
@@ -161,6 +162,7 @@ class Holder(bpy.types.Operator):
                 (6, 7, 3, 2)
             ]
         me = bpy.data.meshes.new(name_mesh)
+        me['tu_made'] = True
         diag = bpy.data.objects.new(name, me)
         bpy.context.scene.collection.objects.link(diag)
         me.from_pydata(verts, [], faces)
@@ -0,0 +1,41 @@
+import bpy
+import os
+from . import mesh_budget
+
+
+def make_image_plane(file_path, plane_height, collection=None):
+    '''Load an image and make a flat plane `plane_height` tall with the image's aspect ratio and UVs that fill it'''
+    loaded = set(bpy.data.images)
+    image = bpy.data.images.load(file_path, check_existing=True)
+    # an image that was already in the file is the user's, only one loaded here can be removed by `cleanup`
+    if image not in loaded:
+        image['tu_made'] = True
+    lx, ly = mesh_budget.plane_size(tuple(image.size), plane_height)
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    mesh = bpy.data.meshes.new(name)
+    mesh['tu_made'] = True
+    mesh.from_pydata(
+        [
+            (-0.5 * lx, -0.5 * ly, 0),
+            (0.5 * lx, -0.5 * ly, 0),
+            (0.5 * lx, 0.5 * ly, 0),
+            (-0.5 * lx, 0.5 * ly, 0)
+        ],
+        [],
+        [(0, 1, 2, 3)]
+    )
+    uv_layer = mesh.uv_layers.new(name='UVMap')
+    uv_layer.data.foreach_set('uv', [0, 0, 1, 0, 1, 1, 0, 1])
+    mesh.update()
+    obj = bpy.data.objects.new(name, mesh)
+    # `EmbossPlane` uses this image rather than searching for one by name
+    obj['TU_image'] = image.name
+    if collection is None:
+        collection = bpy.context.scene.collection
+    collection.objects.link(obj)
+    obj.location = bpy.context.scene.cursor.location
+    for other in bpy.context.view_layer.objects.selected:
+        other.select_set(False)
+    obj.select_set(True)
+    bpy.context.view_layer.objects.active = obj
+    return obj
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import struct
+import time
+
+# config keys that do not change what is built
+IGNORED_KEYS = ['manifest', 'job_id']
+PROGRESS_PREFIX = 'TU_PROGRESS'
+
+
+def config_hash(config):
+    '''Hash of a job config (ignoring the manifest settings) to tell if a finished job is still up to date'''
+    config = {k: v for k, v in config.items() if k not in IGNORED_KEYS}
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def read_manifest(file_path):
+    if (not file_path) or (not os.path.exists(file_path)):
+        return []
+    records = []
+    with open(file_path) as manifest_file:
+        for line in manifest_file:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # a line cut short when a run was killed
+                continue
+    return records
+
+
+def validate_output(file_path):
+    '''Check an output file exists and (for binary `.stl` files) that its size matches its triangle count'''
+    if (not os.path.isfile(file_path)) or (os.path.getsize(file_path) == 0):
+        return False
+    if file_path.lower().endswith('.stl'):
+        with open(file_path, 'rb') as stl_file:
+            header = stl_file.read(84)
+        if header[:5] == b'solid':
+            # ASCII stl
+            return True
+        if len(header) < 84:
+            return False
+        n_triangles = struct.unpack('<I', header[80:84])[0]
+        return os.path.getsize(file_path) == 84 + 50 * n_triangles
+    return True
+
+
+class Job:
+    '''Write the progress of a build to a JSON-lines manifest (if one is given) and to stdout'''
+
+    def __init__(self, manifest_path, job_id, config):
+        self.manifest_path = manifest_path
+        self.job_id = job_id
+        self.config_hash = config_hash(config)
+        self.start_time = time.perf_counter()
+
+    def completed(self):
+        '''The last finished record of this job if its config has not changed and its outputs are still good'''
+        for record in reversed(read_manifest(self.manifest_path)):
+            if record.get('job') != self.job_id:
+                continue
+            if record['event'] in ('start', 'stage'):
+                continue
+            if (record['event'] == 'done') and (record.get('config_hash') == self.config_hash):
+                outputs = record.get('outputs', {})
+                if (len(outputs) > 0) and all(validate_output(path) for path in outputs.values()):
+                    return record
+            return None
+        return None
+
+    def event(self, event, **data):
+        record = {
+            'job': self.job_id,
+            'config_hash': self.config_hash,
+            'event': event,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'elapsed': time.perf_counter() - self.start_time
+        }
+        record.update(data)
+        line = json.dumps(record)
+        print('{0} {1}'.format(PROGRESS_PREFIX, line), flush=True)
+        if self.manifest_path:
+            with open(self.manifest_path, 'a') as manifest_file:
+                manifest_file.write(line + '\n')
+        return record
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        return self.event('start')
+
+    def stage(self, record):
+        '''Callback for `timing.StageTimer`'''
+        return self.event('stage', **record)
+
+    def done(self, outputs, timing=None, **data):
+        return self.event('done', outputs=outputs, timing=timing, **data)
+
+    def error(self, error):
+        return self.event('error', error=error)
@@ -0,0 +1,71 @@
+import json
+import math
+import numpy as np
+from .validation import signed_volume
+
+# a PLA print with a 0.4mm nozzle, any of these can be changed in the `measure` config
+DEFAULTS = {
+    'density': 1.24,
+    'filament_diameter': 1.75,
+    'layer_height': 0.2,
+    'wall_thickness': 0.8,
+    'infill': 0.2,
+    'flow_rate': 8,
+    'layer_time': 2
+}
+
+
+def surface_area(verts, tris):
+    corners = verts[tris].astype(np.float64)
+    return 0.5 * np.linalg.norm(np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]), axis=1).sum()
+
+
+def measure_part(verts, tris, settings):
+    '''The size, filament use and print time of one closed part (lengths in mm, mass in g, time in s)'''
+    volume = abs(float(signed_volume(verts, tris)))
+    area = float(surface_area(verts, tris))
+    low = verts.min(axis=0).astype(float)
+    high = verts.max(axis=0).astype(float)
+    # the walls are printed solid and the inside at the infill fraction
+    shell = min(volume, area * settings['wall_thickness'])
+    printed = shell + settings['infill'] * (volume - shell)
+    layers = int(math.ceil((high[2] - low[2]) / settings['layer_height']))
+    return {
+        'triangles': len(tris),
+        'volume': volume,
+        'area': area,
+        'bbox_min': low.tolist(),
+        'bbox_max': high.tolist(),
+        'size': (high - low).tolist(),
+        'printed_volume': printed,
+        'mass': printed * settings['density'] / 1000,
+        'filament_length': printed / (math.pi * (0.5 * settings['filament_diameter'])**2),
+        'layers': layers,
+        'print_time': printed / settings['flow_rate'] + layers * settings['layer_time']
+    }
+
+
+def measure_parts(parts, settings=None):
+    '''Measure every part in {part: (name, vertices, triangles)}, the `total` adds them all up as separate prints'''
+    settings = dict(DEFAULTS, **(settings or {}))
+    measures = {}
+    for key, (name, verts, tris) in parts.items():
+        measures[key] = measure_part(verts, tris, settings)
+    total_keys = ['triangles', 'volume', 'area', 'printed_volume', 'mass', 'filament_length', 'print_time']
+    measures['total'] = {k: sum(m[k] for m in measures.values()) for k in total_keys}
+    return measures
+
+
+def format_measures(measures):
+    total = measures['total']
+    return '{0:.1f} cm^3, {1:.1f} g of filament ({2:.2f} m), about {3:.0f} minutes to print'.format(
+        total['volume'] / 1000,
+        total['mass'],
+        total['filament_length'] / 1000,
+        total['print_time'] / 60
+    )
+
+
+def write_measures(file_path, **measures):
+    with open(file_path, 'w') as measure_file:
+        json.dump(measures, measure_file, indent=2)
@@ -0,0 +1,178 @@
+import struct
+
+# STL files have an 84 byte header and 50 bytes per triangle
+STL_HEADER_BYTES = 84
+STL_TRIANGLE_BYTES = 50
+
+# Rough costs used to predict the memory and time of a build, these can be
+# calibrated for a given machine with the `timing_report` of a real build
+DEFAULT_COSTS = {
+    'base_memory_mb': 200,
+    'bytes_per_base_face': 1000,
+    'bytes_per_final_face': 400,
+    'seconds_per_base_vert': 2e-5,
+    'seconds_per_final_face': 1e-6,
+    'triangles_per_character': 500
+}
+
+# the (triangulated) sub-objects, excluding the text
+WEDGE_TRIANGLES = 24
+NAME_PLATE_TRIANGLES = 60
+BACK_FRAME_TRIANGLES = 48
+
+
+def read_image_size(file_path):
+    '''Read the (width, height) from a PNG header without loading the image, returns None for other formats'''
+    with open(file_path, 'rb') as image_file:
+        header = image_file.read(24)
+    if (len(header) < 24) or (header[:8] != b'\x89PNG\r\n\x1a\n'):
+        return None
+    return struct.unpack('>II', header[16:24])
+
+
+def plane_size(image_size, plane_height):
+    width, height = image_size
+    return plane_height * width / height, plane_height
+
+
+def grid_cuts(lx, ly, fpu):
+    '''The number of cuts across the x (length `lx`) and y (length `ly`) sides of the plane so there are
+    `fpu` faces per unit length along both'''
+    nx = round(lx * fpu) - 1
+    ny = round(ly * fpu) - 1
+    return max(nx, 0), max(ny, 0)
+
+
+def sub_object_triangles(keywords):
+    triangles = 0
+    text = ''
+    if keywords['External_edge'] != 'NONE':
+        triangles += WEDGE_TRIANGLES + NAME_PLATE_TRIANGLES
+        if keywords['Back_frame']:
+            triangles += 2 * BACK_FRAME_TRIANGLES
+        if keywords['Name_plate']:
+            text = keywords['Name_plate_text']
+    else:
+        if keywords['Name_plate']:
+            triangles += NAME_PLATE_TRIANGLES
+            text = keywords['Name_plate_text']
+        if keywords['Back_frame']:
+            triangles += BACK_FRAME_TRIANGLES
+    return triangles, len(text.replace(' ', ''))
+
+
+def estimate_model(lx, ly, keywords, costs=None):
+    '''Predict the size, memory and time of an `EmbossPlane` build of a `lx` by `ly` plane'''
+    costs = dict(DEFAULT_COSTS, **(costs or {}))
+    nx, ny = grid_cuts(lx, ly, keywords['Fpu'])
+    levels = keywords.get('Subsurf_levels', 2)
+    top_faces = (nx + 1) * (ny + 1)
+    wall_faces = 2 * (nx + 1) + 2 * (ny + 1)
+    # each level of the SUBSURF modifier splits every quad into 4
+    final_faces = (top_faces + wall_faces) * 4**levels
+    if keywords.get('Bottom_type', 'CAP') == 'GRID':
+        # the bottom has as many faces as the top
+        base_faces = 2 * top_faces + wall_faces
+        base_verts = 2 * (nx + 2) * (ny + 2)
+        final_faces += top_faces * 4**levels
+    else:
+        # a single n-gon around the wall_faces boundary vertices, subdivision turns it into one quad per side
+        base_faces = top_faces + wall_faces + 1
+        base_verts = (nx + 2) * (ny + 2) + wall_faces
+        if levels > 0:
+            final_faces += wall_faces * 4**(levels - 1)
+        else:
+            final_faces += 0.5 * (wall_faces - 2)
+    other_triangles, characters = sub_object_triangles(keywords)
+    other_triangles += characters * costs['triangles_per_character']
+    triangles = int(2 * final_faces) + other_triangles
+    memory = costs['base_memory_mb'] + (
+        (base_faces * costs['bytes_per_base_face']) + (final_faces * costs['bytes_per_final_face'])
+    ) / 1024**2
+    time = (base_verts * costs['seconds_per_base_vert']) + (final_faces * costs['seconds_per_final_face'])
+    if keywords['Spike_removal']:
+        # the modifier stack is evaluated an extra time to find the spikes
+        time += final_faces * costs['seconds_per_final_face']
+    return {
+        'lx': lx,
+        'ly': ly,
+        'Fpu': keywords['Fpu'],
+        'nx': nx,
+        'ny': ny,
+        'base_faces': base_faces,
+        'final_faces': final_faces,
+        'triangles': triangles,
+        'stl_mb': (STL_HEADER_BYTES + STL_TRIANGLE_BYTES * triangles) / 1024**2,
+        'memory_mb': memory,
+        'time_s': time
+    }
+
+
+def format_estimate(estimate):
+    return (
+        'Fpu {Fpu:.3g} ({nx} x {ny} cuts): {base_faces} base faces, {triangles} triangles, '
+        'STL {stl_mb:.1f} MB, ~{memory_mb:.0f} MB memory, ~{time_s:.0f}s'
+    ).format(**estimate)
+
+
+BUDGET_KEYS = {
+    'max_triangles': 'triangles',
+    'max_stl_mb': 'stl_mb',
+    'max_memory_mb': 'memory_mb',
+    'max_time_s': 'time_s'
+}
+
+
+def over_budget(estimate, budget):
+    '''List the parts of the budget the estimate goes over'''
+    problems = []
+    for budget_key, estimate_key in BUDGET_KEYS.items():
+        if (budget_key in budget) and (estimate[estimate_key] > budget[budget_key]):
+            problems.append('{0} {1:.4g} > {2:.4g}'.format(estimate_key, estimate[estimate_key], budget[budget_key]))
+    return problems
+
+
+def fit_fpu(lx, ly, keywords, budget, costs=None, iterations=40):
+    '''Find the largest Fpu (no larger than the one asked for) that fits the budget, returns None if nothing fits'''
+    def fits(fpu):
+        trial = dict(keywords, Fpu=fpu)
+        return len(over_budget(estimate_model(lx, ly, trial, costs=costs), budget)) == 0
+
+    high = keywords['Fpu']
+    if fits(high):
+        return high
+    # the smallest Fpu that still makes at least one cut in each direction
+    low = 2 / min(lx, ly)
+    if not fits(low):
+        return None
+    for _ in range(iterations):
+        mid = 0.5 * (low + high)
+        if fits(mid):
+            low = mid
+        else:
+            high = mid
+    return low
+
+
+def target_budget(keywords):
+    '''The triangle and STL size targets set on `EmbossPlane` (empty if it should use Fpu)'''
+    budget = {}
+    if keywords.get('Triangle_budget', 0) > 0:
+        budget['max_triangles'] = keywords['Triangle_budget']
+    if keywords.get('Stl_budget', 0) > 0:
+        budget['max_stl_mb'] = keywords['Stl_budget']
+    return budget
+
+
+def choose_fpu(lx, ly, keywords, costs=None):
+    '''The Fpu to build with, solving for the largest grid that fits the targets if any are set'''
+    budget = target_budget(keywords)
+    if len(budget) == 0:
+        return keywords['Fpu']
+    high = 2 / min(lx, ly)
+    # double until the build no longer fits to get an upper bound
+    for _ in range(30):
+        if len(over_budget(estimate_model(lx, ly, dict(keywords, Fpu=high), costs=costs), budget)) > 0:
+            break
+        high *= 2
+    return fit_fpu(lx, ly, dict(keywords, Fpu=high), budget, costs=costs)
@@ -0,0 +1,132 @@
+import io
+import zipfile
+import numpy as np
+
+EXPORT_TYPES = ('MESH', 'FONT', 'CURVE')
+
+CONTENT_TYPES_3MF = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>'
+    '</Types>'
+)
+RELS_3MF = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Target="/3D/3dmodel.model" Id="rel0" '
+    'Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>'
+    '</Relationships>'
+)
+
+
+def mesh_arrays(obj, depsgraph):
+    '''The world space vertices (float32) and triangles (int32) of the evaluated mesh of `obj`'''
+    obj_eval = obj.evaluated_get(depsgraph)
+    mesh = obj_eval.to_mesh()
+    mesh.calc_loop_triangles()
+    verts = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', verts)
+    tris = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+    mesh.loop_triangles.foreach_get('vertices', tris)
+    obj_eval.to_mesh_clear()
+    verts = verts.reshape(-1, 3)
+    matrix = np.array(obj.matrix_world, dtype=np.float32)
+    verts = verts @ matrix[:3, :3].T + matrix[:3, 3]
+    return verts, tris.reshape(-1, 3)
+
+
+def scene_parts(objects, depsgraph):
+    '''(name, vertices, triangles) of each object that would be exported'''
+    parts = []
+    for obj in objects:
+        if obj.type not in EXPORT_TYPES:
+            continue
+        verts, tris = mesh_arrays(obj, depsgraph)
+        if len(tris) > 0:
+            parts.append((obj.name, verts, tris))
+    return parts
+
+
+def merge_parts(parts):
+    offsets = np.cumsum([0] + [len(verts) for _, verts, _ in parts])
+    verts = np.concatenate([verts for _, verts, _ in parts])
+    tris = np.concatenate([tris + offset for (_, _, tris), offset in zip(parts, offsets)])
+    return verts, tris
+
+
+def write_stl(file_path, parts, matrix=None):
+    '''Write all the parts into one binary STL file, the 4x4 `matrix` is applied to the vertices first'''
+    verts, tris = merge_parts(parts)
+    if matrix is not None:
+        verts = verts @ matrix[:3, :3].T + matrix[:3, 3]
+        if np.linalg.det(matrix[:3, :3]) < 0:
+            # a mirror turns the triangles inside out
+            tris = tris[:, ::-1]
+    corners = verts[tris].astype(np.float32)
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    length = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals = np.divide(normals, length, out=np.zeros_like(normals), where=length > 0)
+    facets = np.zeros(len(tris), dtype=[('normal', '<f4', (3,)), ('corners', '<f4', (3, 3)), ('attribute', '<u2')])
+    facets['normal'] = normals
+    facets['corners'] = corners
+    with open(file_path, 'wb') as stl_file:
+        stl_file.write(b'Tactile Universe'.ljust(80, b' '))
+        stl_file.write(np.array(len(tris), dtype='<u4').tobytes())
+        stl_file.write(facets.tobytes())
+
+
+def write_ply(file_path, parts):
+    '''Write all the parts into one binary (little endian) PLY file'''
+    verts, tris = merge_parts(parts)
+    header = (
+        'ply\n'
+        'format binary_little_endian 1.0\n'
+        'element vertex {0}\n'
+        'property float x\n'
+        'property float y\n'
+        'property float z\n'
+        'element face {1}\n'
+        'property list uchar int vertex_indices\n'
+        'end_header\n'
+    ).format(len(verts), len(tris))
+    faces = np.empty(len(tris), dtype=[('n', 'u1'), ('vertex_indices', '<i4', (3,))])
+    faces['n'] = 3
+    faces['vertex_indices'] = tris
+    with open(file_path, 'wb') as ply_file:
+        ply_file.write(header.encode('ascii'))
+        ply_file.write(verts.astype('<f4').tobytes())
+        ply_file.write(faces.tobytes())
+
+
+def model_3mf(parts):
+    '''The 3D model XML of a 3MF file with each part as its own object'''
+    model = io.StringIO()
+    model.write(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<model unit="millimeter" xml:lang="en-US" '
+        'xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">\n'
+        '<resources>\n'
+    )
+    for object_id, (name, verts, tris) in enumerate(parts, start=1):
+        model.write('<object id="{0}" name="{1}" type="model"><mesh><vertices>\n'.format(
+            object_id,
+            name.replace('&', '&amp;').replace('"', '&quot;').replace('<', '&lt;')
+        ))
+        np.savetxt(model, verts, fmt='<vertex x="%.6g" y="%.6g" z="%.6g"/>')
+        model.write('</vertices><triangles>\n')
+        np.savetxt(model, tris, fmt='<triangle v1="%d" v2="%d" v3="%d"/>')
+        model.write('</triangles></mesh></object>\n')
+    model.write('</resources>\n<build>\n')
+    for object_id in range(1, len(parts) + 1):
+        model.write('<item objectid="{0}"/>\n'.format(object_id))
+    model.write('</build>\n</model>\n')
+    return model.getvalue()
+
+
+def write_3mf(file_path, parts):
+    '''Write the parts as separate objects of a (zipped) 3MF file'''
+    with zipfile.ZipFile(file_path, 'w', compression=zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr('[Content_Types].xml', CONTENT_TYPES_3MF)
+        zip_file.writestr('_rels/.rels', RELS_3MF)
+        zip_file.writestr('3D/3dmodel.model', model_3mf(parts))
@@ -2,6 +2,7 @@ import bpy
 import math
 from mathutils import Vector, Matrix
 from bpy.props import FloatProperty, BoolProperty, StringProperty
+from . import text_cache
 
 
 class NamePlate(bpy.types.Operator):
@@ -77,8 +78,6 @@ class NamePlate(bpy.types.Operator):
     def remove_text(self):
         if self.text_object_key in bpy.data.objects.keys():
             bpy.data.objects.remove(bpy.data.objects[self.text_object_key], do_unlink=True)
-        if self.text_cure_key in bpy.data.curves.keys():
-            bpy.data.curves.remove(bpy.data.curves[self.text_cure_key], do_unlink=True)
 
     def make_name_plate_flat(self):
         self.remove_name_plate()
@@ -114,6 +113,7 @@ class NamePlate(bpy.types.Operator):
             (2, 3, 7, 6)
         ]
         me = bpy.data.meshes.new(self.name_plate_mesh_key)
+        me['tu_made'] = True
         self.name_plate = bpy.data.objects.new(self.name_plate_object_key, me)
         bpy.context.scene.collection.objects.link(self.name_plate)
         me.from_pydata(verts, [], faces)
@@ -191,6 +191,7 @@ class NamePlate(bpy.types.Operator):
             (0, 1, 5, 9, 13, 12, 8, 17, 21, 20, 16, 4)
         ]
         me = bpy.data.meshes.new(self.name_plate_mesh_key)
+        me['tu_made'] = True
         self.name_plate = bpy.data.objects.new(self.name_plate_object_key, me)
         bpy.context.scene.collection.objects.link(self.name_plate)
         me.from_pydata(verts, [], faces)
@@ -200,14 +201,16 @@ class NamePlate(bpy.types.Operator):
 
     def make_font(self):
         self.remove_text()
-        self.font_curve = bpy.data.curves.new(type="FONT", name=self.text_cure_key)
-        self.font_curve.extrude = 1
-        self.font_object = bpy.data.objects.new(self.text_object_key, self.font_curve)
+        # text meshes are shared between all name plates with the same text and size
+        text_mesh = text_cache.get_text_mesh(
+            self.Text,
+            self.Text_size,
+            self.Size_x,
+            self.Size_y,
+            extrude=1
+        )
+        self.font_object = bpy.data.objects.new(self.text_object_key, text_mesh)
         bpy.context.scene.collection.objects.link(self.font_object)
-        self.font_curve.size = self.Text_size
-        self.font_object.data.body = self.Text
-        self.font_object.data.align_x = 'CENTER'
-        self.font_object.data.align_y = 'CENTER'
         self.font_object.location = Vector((
             0,
             0,
@@ -217,7 +220,6 @@ class NamePlate(bpy.types.Operator):
     def execute(self, context):
         self.name_plate_object_key = '{0}_Plate'.format(self.Object_name)
         self.name_plate_mesh_key = '{0}_Mesh'.format(self.Object_name)
-        self.text_cure_key = '{0}_FontCurve'.format(self.Object_name)
         self.text_object_key = '{0}_FontObject'.format(self.Object_name)
         if self.Notches:
             self.make_name_plate_notches()
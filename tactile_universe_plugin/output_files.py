@@ -0,0 +1,147 @@
+import bpy
+import json
+import os
+import time
+import numpy as np
+from bpy_extras.io_utils import axis_conversion
+from mathutils import Matrix
+from . import mesh_export
+
+# how the .blend file is saved:
+#   packed: images packed into an uncompressed file (the original behaviour)
+#   compressed: images packed into a compressed file
+#   linked: images left as links to the files on disk
+#   none: no .blend file
+BLEND_MODES = ['packed', 'compressed', 'linked', 'none']
+PROFILES = {
+    'full': {'blend': 'packed', 'stl': True},
+    'compressed': {'blend': 'compressed', 'stl': True},
+    'linked': {'blend': 'linked', 'stl': True},
+    'stl_only': {'blend': 'none', 'stl': True}
+}
+# the indexed mesh formats and the per-part .stl files are off unless asked for
+FORMAT_DEFAULTS = {'ply': False, '3mf': False, 'stl_parts': False}
+# the `wm.stl_export` keywords the .stl writer understands, any others are passed to `wm.stl_export`
+# (`apply_modifiers` is only accepted as `true`, the parts are always the evaluated meshes)
+STL_KEYWORDS = ['forward_axis', 'up_axis', 'global_scale', 'use_scene_unit', 'apply_modifiers', 'check_existing']
+
+
+def get_outputs(outputs):
+    '''The output settings from the `outputs` config, either a profile name or a dict (optionally with a `profile`)'''
+    if isinstance(outputs, str):
+        outputs = {'profile': outputs}
+    outputs = dict(outputs)
+    profile = outputs.pop('profile', 'full')
+    if profile not in PROFILES:
+        raise ValueError('Unknown output profile `{0}`, use one of {1}'.format(profile, ', '.join(PROFILES)))
+    settings = dict(FORMAT_DEFAULTS, **PROFILES[profile])
+    settings.update(outputs)
+    if settings['blend'] not in BLEND_MODES:
+        raise ValueError('Unknown blend output `{0}`, use one of {1}'.format(settings['blend'], ', '.join(BLEND_MODES)))
+    return settings
+
+
+def file_report(file_path, start):
+    return {
+        'path': file_path,
+        'bytes': os.path.getsize(file_path),
+        'time': time.perf_counter() - start
+    }
+
+
+def save_blend(file_path, mode):
+    '''Save the .blend file in the given mode, returns the file size and time taken'''
+    start = time.perf_counter()
+    if mode != 'linked':
+        bpy.ops.file.pack_all()
+    bpy.ops.wm.save_mainfile(
+        filepath=file_path,
+        check_existing=False,
+        compress=(mode == 'compressed')
+    )
+    return file_report(file_path, start)
+
+
+def model_parts(obj, depsgraph, reuse=None):
+    '''The evaluated (name, vertices, triangles) of each part of the model made from `obj` by `EmbossPlane`, keyed by part.
+    The parts in `reuse` are kept rather than evaluated again'''
+    names = json.loads(obj.get('TU_parts', '{}')) or {'model': obj.name}
+    parts = {}
+    for key, name in names.items():
+        if (reuse is not None) and (key in reuse):
+            parts[key] = reuse[key]
+            continue
+        part = bpy.data.objects.get(name)
+        if (part is None) or (part.type not in mesh_export.EXPORT_TYPES):
+            continue
+        verts, tris = mesh_export.mesh_arrays(part, depsgraph)
+        if len(tris) > 0:
+            parts[key] = (name, verts, tris)
+    return parts
+
+
+def stl_matrix(stl_keywords):
+    '''The axis conversion and scale `wm.stl_export` would apply with these keywords'''
+    scale = stl_keywords.get('global_scale', 1.0)
+    if stl_keywords.get('use_scene_unit', False):
+        scale *= bpy.context.scene.unit_settings.scale_length
+    matrix = Matrix.Scale(scale, 4) @ axis_conversion(
+        to_forward=stl_keywords.get('forward_axis', 'Y').replace('NEGATIVE_', '-'),
+        to_up=stl_keywords.get('up_axis', 'Z').replace('NEGATIVE_', '-')
+    ).to_4x4()
+    return np.array(matrix, dtype=np.float32)
+
+
+def check_stl_keywords(stl_keywords):
+    if not stl_keywords.get('apply_modifiers', True):
+        raise ValueError('`apply_modifiers` can not be turned off, the .stl files are written from the evaluated model')
+
+
+def write_stl(file_path, parts, stl_keywords):
+    '''Write the parts into one .stl file, returns its report.
+    Keywords the writer does not understand fall back to `wm.stl_export` of the whole scene'''
+    start = time.perf_counter()
+    check_stl_keywords(stl_keywords)
+    if set(stl_keywords) - set(STL_KEYWORDS):
+        bpy.ops.wm.stl_export(filepath=file_path, check_existing=False, **stl_keywords)
+    else:
+        mesh_export.write_stl(file_path, parts, stl_matrix(stl_keywords))
+    return file_report(file_path, start)
+
+
+def write_stls(base_path, settings, parts, stl_keywords):
+    '''Write the merged .stl of all the parts, and one for each part if `stl_parts` is set in `settings`'''
+    outputs = {'stl': '{0}.stl'.format(base_path)}
+    io = {'stl': write_stl(outputs['stl'], list(parts.values()), stl_keywords)}
+    if settings['stl_parts']:
+        matrix = stl_matrix(stl_keywords)
+        for key, part in parts.items():
+            start = time.perf_counter()
+            output_key = 'stl_{0}'.format(key)
+            outputs[output_key] = '{0}_{1}.stl'.format(base_path, key)
+            mesh_export.write_stl(outputs[output_key], [part], matrix)
+            io[output_key] = file_report(outputs[output_key], start)
+    return outputs, io
+
+
+def write_indexed(base_path, settings, parts):
+    '''Write the PLY and/or 3MF files asked for in `settings`, returns the output paths and their reports'''
+    outputs = {}
+    io = {}
+    if not (settings['ply'] or settings['3mf']):
+        return outputs, io
+    start = time.perf_counter()
+    for key, extension, writer in [('ply', 'ply', mesh_export.write_ply), ('3mf', '3mf', mesh_export.write_3mf)]:
+        if settings[key]:
+            outputs[key] = '{0}.{1}'.format(base_path, extension)
+            writer(outputs[key], parts)
+            io[key] = file_report(outputs[key], start)
+            start = time.perf_counter()
+    return outputs, io
+
+
+def format_io(io):
+    return '\n'.join(
+        '{0}: {1:.1f} MB in {2:.2f}s'.format(report['path'], report['bytes'] / 1024**2, report['time'])
+        for report in io.values()
+    )
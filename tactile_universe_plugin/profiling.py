@@ -0,0 +1,86 @@
+import cProfile
+import functools
+import itertools
+import os
+import time
+import tracemalloc
+
+# comma separated list of profilers to use, e.g. `TU_PROFILE=cprofile,tracemalloc`
+PROFILE_ENV = 'TU_PROFILE'
+# folder the profiles are written to
+PROFILE_DIR_ENV = 'TU_PROFILE_DIR'
+MODES = ('cprofile', 'tracemalloc')
+
+_counter = itertools.count()
+_active_profile = None
+
+
+def get_settings(preferences=None):
+    '''Read the profiling modes and output folder from the environment, falling back to the add-on preferences'''
+    modes = set()
+    for mode in os.environ.get(PROFILE_ENV, '').split(','):
+        mode = mode.strip().lower()
+        if mode in MODES:
+            modes.add(mode)
+    directory = os.environ.get(PROFILE_DIR_ENV, '')
+    if preferences is not None:
+        if preferences.Profile_cprofile:
+            modes.add('cprofile')
+        if preferences.Profile_tracemalloc:
+            modes.add('tracemalloc')
+        if directory == '':
+            directory = preferences.Profile_directory
+    if directory == '':
+        directory = os.getcwd()
+    return modes, directory
+
+
+def profile_base_name(operator, directory):
+    return os.path.join(
+        directory,
+        '{0}_{1}_{2}_{3:03d}'.format(
+            operator.bl_idname.replace('.', '_'),
+            time.strftime('%Y%m%d-%H%M%S'),
+            os.getpid(),
+            next(_counter)
+        )
+    )
+
+
+def profiled(execute, modes, directory):
+    @functools.wraps(execute)
+    def wrapper(self, context):
+        global _active_profile
+        os.makedirs(directory, exist_ok=True)
+        base_name = profile_base_name(self, directory)
+        # operators called from other operators are already covered by the outer profile
+        use_cprofile = ('cprofile' in modes) and (_active_profile is None)
+        start_tracemalloc = ('tracemalloc' in modes) and (not tracemalloc.is_tracing())
+        if start_tracemalloc:
+            tracemalloc.start()
+        if use_cprofile:
+            _active_profile = cProfile.Profile()
+            _active_profile.enable()
+        try:
+            return execute(self, context)
+        finally:
+            if use_cprofile:
+                _active_profile.disable()
+                _active_profile.dump_stats('{0}.prof'.format(base_name))
+                _active_profile = None
+            if 'tracemalloc' in modes:
+                tracemalloc.take_snapshot().dump('{0}.tracemalloc'.format(base_name))
+            if start_tracemalloc:
+                tracemalloc.stop()
+    wrapper.tu_original = execute
+    return wrapper
+
+
+def instrument(cls, modes, directory):
+    '''Wrap (or un-wrap) an operator's `execute` so there is no overhead when profiling is off'''
+    execute = getattr(cls.execute, 'tu_original', cls.execute)
+    if len(modes) > 0:
+        cls.execute = profiled(execute, modes, directory)
+    else:
+        cls.execute = execute
+    return cls
@@ -0,0 +1,96 @@
+# Right-triangulated irregular network (RTIN) meshing of a square heightmap
+# of 2**k + 1 points.  Each right triangle (a, b, c) has its hypotenuse from
+# a to b and splits at the midpoint m into (c, a, m) and (b, c, m).  The error
+# at each midpoint is propagated up the hierarchy, so splitting a triangle
+# always splits its neighbour and the mesh has no T-junctions.
+import numpy as np
+
+
+def root_triangles(tile):
+    return np.array([
+        [[0, 0], [tile, tile], [0, tile]],
+        [[tile, tile], [0, 0], [tile, 0]]
+    ], dtype=np.int32)
+
+
+def split(triangles):
+    a = triangles[:, 0]
+    b = triangles[:, 1]
+    c = triangles[:, 2]
+    m = (a + b) // 2
+    return np.concatenate([
+        np.stack([c, a, m], axis=1),
+        np.stack([b, c, m], axis=1)
+    ])
+
+
+def grid_size(heights):
+    size = heights.shape[0]
+    tile = size - 1
+    if (heights.shape[1] != size) or (tile < 1) or (tile & (tile - 1) != 0):
+        raise ValueError('The heightmap must be a square grid of 2**k + 1 points')
+    return size, tile
+
+
+def compute_errors(heights):
+    '''The error at each grid point, the largest height error made by not splitting at that point'''
+    size, tile = grid_size(heights)
+    h = heights.ravel()
+    errors = np.zeros(size * size, dtype=np.float64)
+    # the triangles at every level that can still be split (legs longer than one grid step)
+    n_levels = 2 * int(np.log2(tile))
+    levels = [root_triangles(tile)]
+    for _ in range(n_levels - 1):
+        levels.append(split(levels[-1]))
+    for level in reversed(range(n_levels)):
+        triangles = levels[level]
+        a = triangles[:, 0]
+        b = triangles[:, 1]
+        c = triangles[:, 2]
+        m = (a + b) // 2
+        ia = a[:, 1] * size + a[:, 0]
+        ib = b[:, 1] * size + b[:, 0]
+        im = m[:, 1] * size + m[:, 0]
+        error = np.abs(0.5 * (h[ia] + h[ib]) - h[im])
+        if level < n_levels - 1:
+            # include the error of the two children
+            lc = (a + c) // 2
+            rc = (b + c) // 2
+            error = np.maximum(error, errors[lc[:, 1] * size + lc[:, 0]])
+            error = np.maximum(error, errors[rc[:, 1] * size + rc[:, 0]])
+        np.maximum.at(errors, im, error)
+        levels[level] = None
+    return errors
+
+
+def extract(errors, size, max_error):
+    '''Split the triangles down from the root until each one is within `max_error`'''
+    tile = size - 1
+    n_levels = 2 * int(np.log2(tile))
+    active = root_triangles(tile)
+    keep = []
+    for _ in range(n_levels):
+        m = (active[:, 0] + active[:, 1]) // 2
+        to_split = errors[m[:, 1] * size + m[:, 0]] > max_error
+        keep.append(active[~to_split])
+        active = split(active[to_split])
+    keep.append(active)
+    return np.concatenate(keep)
+
+
+def build(heights, max_error):
+    '''Mesh a heightmap, returning the grid coordinates (i, j) of the used points and counter-clockwise triangles indexing them'''
+    size, _ = grid_size(heights)
+    errors = compute_errors(heights)
+    triangles = extract(errors, size, max_error)
+    # make all the triangles face +z
+    a = triangles[:, 0]
+    b = triangles[:, 1]
+    c = triangles[:, 2]
+    cross = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])
+    flip = cross < 0
+    triangles[flip, 1], triangles[flip, 2] = c[flip].copy(), b[flip].copy()
+    index = triangles[..., 1] * size + triangles[..., 0]
+    used, faces = np.unique(index, return_inverse=True)
+    points = np.stack([used % size, used // size], axis=1)
+    return points, faces.reshape(-1, 3)
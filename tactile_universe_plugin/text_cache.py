@@ -0,0 +1,89 @@
+import bpy
+import zlib
+from collections import OrderedDict
+
+# maximum number of text meshes the cache keeps track of
+MAX_ENTRIES = 32
+
+# cache key -> mesh name, ordered from least to most recently used
+_text_meshes = OrderedDict()
+
+
+def make_key(text, text_size, size_x, size_y, extrude):
+    return (
+        text,
+        round(text_size, 4),
+        round(size_x, 4),
+        round(size_y, 4),
+        round(extrude, 4)
+    )
+
+
+def mesh_name(key):
+    '''The name a new mesh for `key` is given, so it can be found again after the file is reloaded'''
+    return 'TU_TextMesh_{0:08x}'.format(zlib.crc32(repr(key).encode('utf-8')))
+
+
+def find_mesh(key):
+    '''Look up a cached mesh, checking it has not been removed or replaced (e.g. by undo or loading a file)'''
+    # meshes saved in the .blend file can be re-used after a reload
+    for name in [_text_meshes.get(key), mesh_name(key)]:
+        mesh = bpy.data.meshes.get(name) if name is not None else None
+        if (mesh is not None) and (mesh.get('tu_text_key') == repr(key)):
+            return mesh
+    return None
+
+
+def build_text_mesh(text, text_size, extrude, name):
+    font_curve = bpy.data.curves.new(type='FONT', name='TU_TextCurve')
+    font_curve.extrude = extrude
+    font_curve.size = text_size
+    font_curve.body = text
+    font_curve.align_x = 'CENTER'
+    font_curve.align_y = 'CENTER'
+    font_object = bpy.data.objects.new('TU_TextObject', font_curve)
+    bpy.context.scene.collection.objects.link(font_object)
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    mesh = bpy.data.meshes.new_from_object(font_object.evaluated_get(depsgraph))
+    mesh.name = name
+    mesh['tu_made'] = True
+    bpy.data.objects.remove(font_object, do_unlink=True)
+    bpy.data.curves.remove(font_curve, do_unlink=True)
+    return mesh
+
+
+def remove_unused(keys):
+    '''Drop the entries for `keys` and free their meshes, entries whose mesh a model still uses are kept'''
+    for key in keys:
+        mesh = bpy.data.meshes.get(_text_meshes[key])
+        if (mesh is not None) and (mesh.users > 0):
+            continue
+        if mesh is not None:
+            bpy.data.meshes.remove(mesh, do_unlink=True)
+        del _text_meshes[key]
+
+
+def evict():
+    # least recently used first, the cache stays over `MAX_ENTRIES` while the meshes are in use, the last (most
+    # recently used) entry is the one being returned so it is never removed
+    for key in list(_text_meshes)[:-1]:
+        if len(_text_meshes) <= MAX_ENTRIES:
+            return
+        remove_unused([key])
+
+
+def get_text_mesh(text, text_size, size_x, size_y, extrude=1):
+    '''Return a (shared) mesh of the text, converting the text to a mesh only if it is not already cached'''
+    key = make_key(text, text_size, size_x, size_y, extrude)
+    mesh = find_mesh(key)
+    if mesh is None:
+        mesh = build_text_mesh(text, text_size, extrude, mesh_name(key))
+        mesh['tu_text_key'] = repr(key)
+    _text_meshes[key] = mesh.name
+    _text_meshes.move_to_end(key)
+    evict()
+    return mesh
+
+
+def clear():
+    remove_unused(list(_text_meshes))
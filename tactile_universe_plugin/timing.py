@@ -0,0 +1,141 @@
+import bmesh
+import json
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+
+def peak_memory_mb():
+    '''Peak resident memory of the Blender process so far (None if it can not be measured), after a
+    `StageTimer` stage on Linux this is only the peak since that stage started'''
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        # macOS reports bytes, Linux reports kilobytes
+        return peak / 1024**2
+    return peak / 1024
+
+
+def current_memory_mb():
+    '''Current resident memory of the Blender process (None if it can not be measured)'''
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * resource.getpagesize() / 1024**2
+
+
+def reset_peak_memory():
+    '''Restart the peak resident memory (`VmHWM`) from the current memory, returns False if it can not be reset
+    (only Linux can)'''
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        return False
+    return True
+
+
+def peak_memory_since_reset_mb():
+    '''Peak resident memory since the last `reset_peak_memory` (None if it can not be measured)'''
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except (OSError, IndexError, ValueError):
+        return None
+    return None
+
+
+# the peak memory so far of each stage that is running (outermost first), stages run inside other stages
+# (e.g. the emboss inside `make_model.py`) so each reset is folded into all of them first
+_open_peaks = []
+
+
+def fold_peak_memory():
+    peak = peak_memory_since_reset_mb()
+    if peak is None:
+        return
+    for i, open_peak in enumerate(_open_peaks):
+        if open_peak is not None:
+            _open_peaks[i] = max(open_peak, peak)
+
+
+def mesh_counts(obj):
+    if (obj is None) or (obj.type != 'MESH'):
+        return None, None
+    if obj.mode == 'EDIT':
+        bm = bmesh.from_edit_mesh(obj.data)
+        return len(bm.verts), len(bm.faces)
+    return len(obj.data.vertices), len(obj.data.polygons)
+
+
+class StageTimer:
+    '''Record the wall time, mesh size and memory of each stage of a build'''
+
+    def __init__(self, name='', callback=None):
+        self.name = name
+        self.stages = []
+        # called with the record of each stage as it finishes (e.g. to report progress)
+        self.callback = callback
+
+    @contextmanager
+    def stage(self, name, obj=None):
+        start = time.perf_counter()
+        memory_before = current_memory_mb()
+        fold_peak_memory()
+        _open_peaks.append(memory_before if reset_peak_memory() else None)
+        try:
+            yield
+        finally:
+            fold_peak_memory()
+            peak = _open_peaks.pop()
+            record = {
+                'stage': name,
+                'time': time.perf_counter() - start,
+                # the peak resident memory during this stage
+                'peak_memory_mb': peak,
+                'memory_increase_mb': None
+            }
+            if (memory_before is not None) and (peak is not None):
+                record['memory_increase_mb'] = peak - memory_before
+            verts, faces = mesh_counts(obj)
+            if verts is not None:
+                record['verts'] = verts
+                record['faces'] = faces
+            self.stages.append(record)
+            if self.callback is not None:
+                self.callback(record)
+
+    @property
+    def total(self):
+        return sum(s['time'] for s in self.stages)
+
+    def summary(self):
+        stages = ', '.join('{0} {1:.2f}s'.format(s['stage'], s['time']) for s in self.stages)
+        return '{0} took {1:.2f}s ({2})'.format(self.name, self.total, stages)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'total_time': self.total,
+            'stages': self.stages
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+    def write(self, file_path, **extra):
+        report = self.to_dict()
+        report.update(extra)
+        with open(file_path, 'w') as report_file:
+            json.dump(report, report_file, indent=2)
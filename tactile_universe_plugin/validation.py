@@ -0,0 +1,221 @@
+import numpy as np
+
+# the checks that must pass for a model to be printed, any limit can be changed in the `validation` config
+DEFAULTS = {
+    'min_thickness': 0.8,
+    'min_wall_thickness': 0.8,
+    'spike_threshold': 0.75,
+    'action': 'report'
+}
+# `none` skips the checks
+ACTIONS = ['report', 'refuse', 'none']
+
+
+def edge_keys(a, b, n_verts):
+    return a.astype(np.int64) * n_verts + b
+
+
+def edge_incidence(tris, n_verts):
+    '''The number of triangles on each (undirected) edge and the number of directed edges used by more than one triangle'''
+    a = tris.ravel()
+    b = np.roll(tris, -1, axis=1).ravel()
+    _, directed_counts = np.unique(edge_keys(a, b, n_verts), return_counts=True)
+    _, counts = np.unique(edge_keys(np.minimum(a, b), np.maximum(a, b), n_verts), return_counts=True)
+    # two triangles that agree on which way is out walk their shared edge in opposite directions
+    return counts, int((directed_counts > 1).sum())
+
+
+def weld(verts, tris, decimals=4):
+    '''Merge the vertices at the same position (as a slicer reading the `.stl` does) and drop the triangles that
+    collapse, e.g. text meshes have separate vertices where their caps meet the sides'''
+    grid = np.round(verts.astype(np.float64) * 10 ** decimals).astype(np.int64)
+    order = np.lexsort(grid.T)
+    first = np.concatenate([[True], (grid[order][1:] != grid[order][:-1]).any(axis=1)])
+    index = np.empty(len(verts), dtype=np.int64)
+    index[order] = np.cumsum(first) - 1
+    tris = index[tris]
+    keep = (tris[:, 0] != tris[:, 1]) & (tris[:, 1] != tris[:, 2]) & (tris[:, 2] != tris[:, 0])
+    return verts[order][first], tris[keep]
+
+
+def signed_volume(verts, tris):
+    corners = verts[tris].astype(np.float64)
+    return np.einsum('ij,ij->i', corners[:, 0], np.cross(corners[:, 1], corners[:, 2])).sum() / 6
+
+
+def face_normals(verts, tris):
+    corners = verts[tris].astype(np.float64)
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    length = np.linalg.norm(normals, axis=1, keepdims=True)
+    return np.divide(normals, length, out=np.zeros_like(normals), where=length > 0)
+
+
+def top_surface(verts, tris, min_normal=0.01):
+    '''The triangles facing up (even steeply, only the walls and the bottom are left out)'''
+    return tris[face_normals(verts, tris)[:, 2] > min_normal]
+
+
+def vertex_mask(tris, n_verts):
+    mask = np.zeros(n_verts, dtype=bool)
+    mask[tris.ravel()] = True
+    return mask
+
+
+def min_thickness(verts, top):
+    '''The thinnest point of a flat bottomed part, the height of its top surface (the triangles `top`) above its base'''
+    if len(top) == 0:
+        return None
+    return float(verts[vertex_mask(top, len(verts)), 2].min() - verts[:, 2].min())
+
+
+def cross_section(verts, tris, z):
+    '''The segments (n, 2, 2) of x, y where the plane at height `z` cuts the triangles'''
+    corners = verts[tris].astype(np.float64)
+    above = corners[:, :, 2] > z
+    cut = (above.sum(axis=1) == 1) | (above.sum(axis=1) == 2)
+    corners = corners[cut]
+    above = above[cut]
+    points = np.zeros((len(corners), 3, 2))
+    crosses = np.zeros((len(corners), 3), dtype=bool)
+    for edge, (i, j) in enumerate([(0, 1), (1, 2), (2, 0)]):
+        crosses[:, edge] = above[:, i] != above[:, j]
+        # edges that do not cross give nan points that are never used
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = (z - corners[:, i, 2]) / (corners[:, j, 2] - corners[:, i, 2])
+            points[:, edge] = corners[:, i, :2] + t[:, None] * (corners[:, j, :2] - corners[:, i, :2])
+    # every cut triangle crosses the plane on exactly two of its edges
+    return points[crosses].reshape(-1, 2, 2)
+
+
+def section_thickness(segments, tolerance=1e-3, chunk=256):
+    '''The thickness of a closed cross section at each of its `segments` (n, 2, 2), measured from the middle of
+    the segment to the first segment hit going inwards along its normal, returns the thickness and length of each'''
+    a = segments[:, 0]
+    d = segments[:, 1] - a
+    length = np.hypot(d[:, 0], d[:, 1])
+    keep = length > tolerance
+    a = a[keep]
+    d = d[keep]
+    length = length[keep]
+    middle = a + 0.5 * d
+    normal = np.stack([-d[:, 1], d[:, 0]], axis=1) / length[:, None]
+    thickness = np.zeros(len(a))
+    for start in range(0, len(a), chunk):
+        o = middle[start:start + chunk, None]
+        n = normal[start:start + chunk, None]
+        w = a[None] - o
+        # the ray `o + t n` meets the segment `a + s d`
+        with np.errstate(divide='ignore', invalid='ignore'):
+            denom = n[..., 0] * d[None, :, 1] - n[..., 1] * d[None, :, 0]
+            t = (w[..., 0] * d[None, :, 1] - w[..., 1] * d[None, :, 0]) / denom
+            s = (w[..., 0] * n[..., 1] - w[..., 1] * n[..., 0]) / denom
+        hit = (s >= 0) & (s < 1)
+        ahead = hit & (t > tolerance)
+        behind = hit & (t < -tolerance)
+        # the inside is the side the ray leaves the section an odd number of times
+        inwards = ahead.sum(axis=1) % 2 == 1
+        thickness[start:start + chunk] = np.where(
+            inwards,
+            np.where(ahead, t, np.inf).min(axis=1),
+            np.where(behind, -t, np.inf).min(axis=1)
+        )
+    return thickness, length
+
+
+def min_wall_thickness(verts, tris):
+    '''The thinnest wall of a part across x or y, measured on the cross section half way between the bottom
+    of the part and the lowest point of its top surface (i.e. through the walls of the border and base)'''
+    top = top_surface(verts, tris)
+    if len(top) == 0:
+        return None
+    low = verts[:, 2].min()
+    level = low + 0.5 * (verts[vertex_mask(top, len(verts)), 2].min() - low)
+    segments = cross_section(verts, tris, level)
+    if len(segments) == 0:
+        return None
+    thickness, length = section_thickness(segments)
+    # rays that never leave an open section have no thickness
+    finite = np.isfinite(thickness)
+    thickness = thickness[finite]
+    length = length[finite]
+    if len(thickness) == 0:
+        return None
+    # a wall is only as thin as its thinnest stretch that is at least twice as long as it is thick, so sharp
+    # corners (thin only right at the tip) are not counted
+    order = np.argsort(thickness)
+    thickness = thickness[order]
+    wall = np.flatnonzero(np.cumsum(length[order]) >= 2 * thickness)
+    return float(thickness[wall[0]] if len(wall) > 0 else thickness[-1])
+
+
+def find_spikes(verts, top, threshold):
+    '''Vertices on the top surface (the triangles `top`) that are more than `threshold` above or below all of
+    their neighbours (the same test as `EmbossPlane.flatten_spikes`)'''
+    a = top.ravel()
+    b = np.roll(top, -1, axis=1).ravel()
+    close = np.abs(verts[a, 2] - verts[b, 2]) < threshold
+    has_close = np.zeros(len(verts), dtype=bool)
+    has_close[a[close]] = True
+    has_close[b[close]] = True
+    return np.flatnonzero(vertex_mask(top, len(verts)) & ~has_close)
+
+
+def check_part(verts, tris, settings, surface=True):
+    '''Watertightness, winding, wall thickness and (for the embossed surface) thickness and spike checks of one part'''
+    counts, flipped = edge_incidence(tris, len(verts))
+    report = {
+        'triangles': len(tris),
+        'open_edges': int((counts == 1).sum()),
+        'non_manifold_edges': int((counts > 2).sum()),
+        'flipped_edges': flipped,
+        'volume': float(signed_volume(verts, tris))
+    }
+    problems = []
+    if report['open_edges'] > 0:
+        problems.append('{0} open edges'.format(report['open_edges']))
+    if report['non_manifold_edges'] > 0:
+        problems.append('{0} non-manifold edges'.format(report['non_manifold_edges']))
+    if report['flipped_edges'] > 0:
+        problems.append('{0} edges between flipped faces'.format(report['flipped_edges']))
+    if report['volume'] < 0:
+        problems.append('inside out')
+    report['min_wall_thickness'] = min_wall_thickness(verts, tris)
+    if (report['min_wall_thickness'] is not None) and (report['min_wall_thickness'] < settings['min_wall_thickness']):
+        problems.append('{0:.2f}mm walls (min {1}mm)'.format(
+            report['min_wall_thickness'],
+            settings['min_wall_thickness']
+        ))
+    if surface:
+        top = top_surface(verts, tris)
+        report['min_thickness'] = min_thickness(verts, top)
+        if (report['min_thickness'] is not None) and (report['min_thickness'] < settings['min_thickness']):
+            problems.append('{0:.2f}mm thick (min {1}mm)'.format(report['min_thickness'], settings['min_thickness']))
+        report['spikes'] = len(find_spikes(verts, top, settings['spike_threshold']))
+        if report['spikes'] > 0:
+            problems.append('{0} spikes'.format(report['spikes']))
+    report['problems'] = problems
+    return report
+
+
+def validate_parts(parts, settings=None):
+    '''Check every part of a model is printable, `parts` is {part: (name, vertices, triangles)}'''
+    settings = dict(DEFAULTS, **(settings or {}))
+    if settings['action'] not in ACTIONS:
+        raise ValueError('Unknown validation action `{0}`, use one of {1}'.format(settings['action'], ', '.join(ACTIONS)))
+    reports = {}
+    for key, (name, verts, tris) in parts.items():
+        verts, tris = weld(verts, tris)
+        # only the embossed surface is checked for thickness and spikes
+        reports[key] = check_part(verts, tris, settings, surface=(key == 'model'))
+    problems = [
+        '{0}: {1}'.format(key, problem)
+        for key, report in reports.items()
+        for problem in report['problems']
+    ]
+    return {'passed': len(problems) == 0, 'problems': problems, 'parts': reports}
+
+
+def format_report(report):
+    if report['passed']:
+        return 'Validation passed'
+    return 'Validation failed: {0}'.format('; '.join(report['problems']))
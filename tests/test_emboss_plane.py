@@ -0,0 +1,132 @@
+import os
+import sys
+import unittest
+
+try:
+    import bpy
+    import numpy as np
+    from mathutils import Matrix
+except ImportError:
+    bpy = None
+
+
+# `compare_meshes.py` measures the distance between the surfaces
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+# the largest distance (in mm) between the surfaces of the two engines
+ENGINE_TOLERANCE = 0.05
+
+
+def get_plugin():
+    for module_name, module in sys.modules.items():
+        if module_name.split('.')[-1] == 'tactile_universe_plugin':
+            return module
+    raise ImportError('The Tactile Universe plugin must be installed and enabled')
+
+
+def make_plane(name, lx, ly, intensity=0.5):
+    '''A flat `lx` by `ly` plane with a matching 64x32 image (of one `intensity` or an array of them), in edit
+    mode ready for `emboss_plane`'''
+    plugin = get_plugin()
+    plugin.cleanup.reset(remove_objects=True)
+    image = bpy.data.images.new(name, width=64, height=32)
+    image['tu_made'] = True
+    rgba = np.ones((32, 64, 4), dtype=np.float32)
+    rgba[..., :3] = np.broadcast_to(intensity, (32, 64))[..., None]
+    image.pixels.foreach_set(rgba.ravel())
+    bpy.ops.mesh.primitive_plane_add(size=1)
+    plane = bpy.context.active_object
+    plane.name = name
+    plane.dimensions = (lx, ly, 0)
+    bpy.ops.object.transform_apply(location=False, rotation=False, scale=True)
+    plane.data['tu_made'] = True
+    plane['TU_image'] = image.name
+    bpy.ops.object.editmode_toggle()
+    return plane
+
+
+def emboss(**keywords):
+    keywords = dict(
+        {
+            'External_edge': 'NONE',
+            'Name_plate': False,
+            'Back_frame': False,
+            'Spike_removal': False
+        },
+        **keywords
+    )
+    bpy.ops.object.emboss_plane(**keywords)
+    bpy.ops.object.editmode_toggle()
+
+
+@unittest.skipIf(bpy is None, 'needs Blender: blender TU_startup.blend -b --python tests/test_emboss_plane.py')
+class TestEmbossPlane(unittest.TestCase):
+    def test_faces_per_unit_on_both_axes(self):
+        plane = make_plane('grid_2_1', 40, 20)
+        emboss(Fpu=1, Subsurf_levels=0)
+        co = np.empty(len(plane.data.vertices) * 3)
+        plane.data.vertices.foreach_get('co', co)
+        top = co.reshape(-1, 3)
+        top = top[np.abs(top[:, 2]) < 1e-6]
+        # one face per mm along both sides of the plane
+        self.assertEqual(len(np.unique(top[:, 0].round(4))) - 1, 40)
+        self.assertEqual(len(np.unique(top[:, 1].round(4))) - 1, 20)
+
+    def test_grid_bottom_is_watertight(self):
+        plugin = get_plugin()
+        plane = make_plane('grid_bottom', 40, 20)
+        emboss(Fpu=1, Subsurf_levels=1, Bottom_type='GRID')
+        verts, tris = plugin.mesh_export.mesh_arrays(plane, bpy.context.evaluated_depsgraph_get())
+        report = plugin.validation.check_part(verts, tris, dict(plugin.validation.DEFAULTS), surface=False)
+        self.assertEqual(report['open_edges'], 0)
+        self.assertEqual(report['non_manifold_edges'], 0)
+        self.assertEqual(report['flipped_edges'], 0)
+        self.assertGreater(report['volume'], 0)
+        # the bottom is a grid as well (2 triangles per quad, 4 quads per face after one level), not a single face
+        down = plugin.validation.face_normals(verts, tris)[:, 2] < -0.9
+        self.assertGreaterEqual(down.sum(), 2 * 4 * 40 * 20)
+
+    def test_adaptive_grid_steps_down_at_the_border(self):
+        plugin = get_plugin()
+        # a black image sits a full `Emboss_height` below the border, so the border edge is a wall
+        plane = make_plane('adaptive_border', 40, 20, intensity=0)
+        emboss(Mesh_type='ADAPTIVE', Subsurf_levels=0, Emboss_height=3, Base_height=3, Border_width=3)
+        verts, tris = plugin.mesh_export.mesh_arrays(plane, bpy.context.evaluated_depsgraph_get())
+        # the grid is refined where the surface steps down, not left as two flat triangles at the border height
+        self.assertGreater((np.abs(verts[:, 2] + 3) < 1e-4).sum(), 0)
+
+    def test_off_centre_plane_keeps_its_place(self):
+        plane = make_plane('off_centre', 40, 20)
+        bpy.ops.object.editmode_toggle()
+        plane.data.transform(Matrix.Translation((30, 10, 0)))
+        for mesh_type in ['UNIFORM', 'ADAPTIVE']:
+            bpy.ops.object.editmode_toggle()
+            emboss(Mesh_type=mesh_type, Subsurf_levels=0)
+            co = np.empty(len(plane.data.vertices) * 3)
+            plane.data.vertices.foreach_get('co', co)
+            co = co.reshape(-1, 3)
+            np.testing.assert_allclose(co[:, :2].min(axis=0), (10, 0), atol=1e-4)
+            np.testing.assert_allclose(co[:, :2].max(axis=0), (50, 20), atol=1e-4)
+            # the border is measured from the edges of the plane, so the middle is embossed
+            weights = np.array([v.groups[0].weight if len(v.groups) > 0 else 0 for v in plane.data.vertices])
+            middle = (np.abs(co[:, 0] - 30) < 5) & (np.abs(co[:, 1] - 10) < 5) & (np.abs(co[:, 2]) < 1e-6)
+            self.assertTrue(np.all(weights[middle] == 1))
+
+    def test_geometry_nodes_matches_modifiers(self):
+        import compare_meshes
+        plugin = get_plugin()
+        y, x = np.mgrid[0:32, 0:64]
+        intensity = 0.5 + 0.4 * np.sin(x / 6) * np.cos(y / 5)
+        meshes = []
+        for engine in ['MODIFIERS', 'GEOMETRY_NODES']:
+            plane = make_plane('engine', 40, 20, intensity=intensity)
+            emboss(Fpu=2, Subsurf_levels=2, Engine=engine)
+            meshes.append(plugin.mesh_export.mesh_arrays(plane, bpy.context.evaluated_depsgraph_get()))
+        result = compare_meshes.compare_meshes(*meshes, n_samples=20000)
+        self.assertLessEqual(result['hausdorff'], ENGINE_TOLERANCE)
+
+
+if __name__ == '__main__':
+    # Blender's own arguments are not for unittest
+    argv = [sys.argv[0]] + (sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else [])
+    result = unittest.main(argv=argv, exit=False).result
+    sys.exit(0 if result.wasSuccessful() else 1)
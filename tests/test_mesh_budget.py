@@ -0,0 +1,38 @@
+import importlib.util
+import os
+import unittest
+
+# load the module on its own, the plugin package needs Blender
+spec = importlib.util.spec_from_file_location(
+    'mesh_budget',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tactile_universe_plugin', 'mesh_budget.py')
+)
+mesh_budget = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(mesh_budget)
+
+
+class TestGridCuts(unittest.TestCase):
+    def test_faces_per_unit_on_both_axes(self):
+        # a 2:1 plane has twice as many faces along x as along y
+        nx, ny = mesh_budget.grid_cuts(200, 100, 1)
+        self.assertEqual((nx + 1) / 200, 1)
+        self.assertEqual((ny + 1) / 100, 1)
+        nx, ny = mesh_budget.grid_cuts(100, 200, 0.5)
+        self.assertEqual((nx, ny), (49, 99))
+
+    def test_estimate_counts_faces(self):
+        keywords = {
+            'Fpu': 1,
+            'External_edge': 'NONE',
+            'Back_frame': False,
+            'Name_plate': False,
+            'Name_plate_text': '',
+            'Spike_removal': False,
+            'Subsurf_levels': 0
+        }
+        estimate = mesh_budget.estimate_model(200, 100, keywords)
+        self.assertEqual((estimate['nx'], estimate['ny']), (199, 99))
+
+
+if __name__ == '__main__':
+    unittest.main()
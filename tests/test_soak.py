@@ -0,0 +1,29 @@
+import os
+import sys
+import unittest
+
+try:
+    import bpy
+except ImportError:
+    bpy = None
+
+# the builds are the ones `bench_plugin.py --soak` runs
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks')
+N_BUILDS = 30
+THRESHOLD_MB = 50
+
+
+@unittest.skipIf(bpy is None, 'needs Blender: blender TU_startup.blend -b --python tests/test_soak.py')
+class TestSoak(unittest.TestCase):
+    def test_memory_and_datablocks_stay_flat(self):
+        sys.path.insert(0, BENCHMARKS)
+        import bench_plugin
+        results = bench_plugin.run_soak(N_BUILDS, bench_plugin.synthetic_heightmap(256), threshold_mb=THRESHOLD_MB)
+        self.assertEqual(results['problems'], [])
+
+
+if __name__ == '__main__':
+    # Blender's own arguments are not for unittest
+    argv = [sys.argv[0]] + (sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else [])
+    result = unittest.main(argv=argv, exit=False).result
+    sys.exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,45 @@
+import sys
+import unittest
+
+try:
+    import bpy
+except ImportError:
+    bpy = None
+
+
+def get_plugin():
+    for module_name, module in sys.modules.items():
+        if module_name.split('.')[-1] == 'tactile_universe_plugin':
+            return module
+    raise ImportError('The Tactile Universe plugin must be installed and enabled')
+
+
+@unittest.skipIf(bpy is None, 'needs Blender: blender TU_startup.blend -b --python tests/test_text_cache.py')
+class TestTextCache(unittest.TestCase):
+    def setUp(self):
+        get_plugin().cleanup.reset(remove_objects=True)
+
+    def test_full_cache_of_used_meshes(self):
+        text_cache = get_plugin().text_cache
+        # every older entry is used by a model, the new one is the only unused mesh in the cache
+        for i in range(text_cache.MAX_ENTRIES + 1):
+            mesh = text_cache.get_text_mesh('Galaxy {0}'.format(i), 10, 50, 10)
+            obj = bpy.data.objects.new('plate_{0}'.format(i), mesh)
+            bpy.context.scene.collection.objects.link(obj)
+        self.assertEqual(obj.data.get('tu_text_key'), repr(text_cache.make_key('Galaxy 32', 10, 50, 10, 1)))
+        self.assertEqual(len(text_cache._text_meshes), text_cache.MAX_ENTRIES + 1)
+
+    def test_unused_meshes_are_evicted(self):
+        text_cache = get_plugin().text_cache
+        for i in range(text_cache.MAX_ENTRIES + 1):
+            text_cache.get_text_mesh('Galaxy {0}'.format(i), 10, 50, 10)
+        self.assertEqual(len(text_cache._text_meshes), text_cache.MAX_ENTRIES)
+        # the least recently used mesh is the one removed
+        self.assertIsNone(text_cache.find_mesh(text_cache.make_key('Galaxy 0', 10, 50, 10, 1)))
+
+
+if __name__ == '__main__':
+    # Blender's own arguments are not for unittest
+    argv = [sys.argv[0]] + (sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else [])
+    result = unittest.main(argv=argv, exit=False).result
+    sys.exit(0 if result.wasSuccessful() else 1)
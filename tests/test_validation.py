@@ -0,0 +1,66 @@
+import importlib.util
+import os
+import unittest
+import numpy as np
+
+# load the module on its own, the plugin package needs Blender
+spec = importlib.util.spec_from_file_location(
+    'validation',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tactile_universe_plugin', 'validation.py')
+)
+validation = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(validation)
+
+
+def box(low, high, offset=0):
+    '''A closed box (8 vertices, 12 outward facing triangles) from the corner `low` to `high`'''
+    (x0, y0, z0), (x1, y1, z1) = low, high
+    verts = np.array([
+        (x0, y0, z0), (x1, y0, z0), (x1, y1, z0), (x0, y1, z0),
+        (x0, y0, z1), (x1, y0, z1), (x1, y1, z1), (x0, y1, z1)
+    ], dtype=np.float64)
+    quads = [(0, 3, 2, 1), (4, 5, 6, 7), (0, 1, 5, 4), (1, 2, 6, 5), (2, 3, 7, 6), (3, 0, 4, 7)]
+    tris = np.array([t for a, b, c, d in quads for t in [(a, b, c), (a, c, d)]]) + offset
+    return verts, tris
+
+
+class TestWallThickness(unittest.TestCase):
+    def test_solid_box(self):
+        verts, tris = box((0, 0, 0), (10, 6, 3))
+        self.assertAlmostEqual(validation.min_wall_thickness(verts, tris), 6)
+
+    def test_thin_wall(self):
+        # two posts joined by a thin wall
+        parts = [box((0, 0, 0), (4, 4, 3)), box((10, 0, 0), (14, 4, 3))]
+        wall = box((0, 4, 0), (14, 4.5, 3))
+        verts = np.concatenate([parts[0][0], parts[1][0], wall[0]])
+        tris = np.concatenate([parts[0][1], parts[1][1] + 8, wall[1] + 16])
+        self.assertAlmostEqual(validation.min_wall_thickness(verts, tris), 0.5)
+        report = validation.check_part(verts, tris, dict(validation.DEFAULTS), surface=False)
+        self.assertIn('0.50mm walls (min 0.8mm)', report['problems'])
+
+    def test_sharp_corner_is_not_a_thin_wall(self):
+        # a wedge, 20mm long and 4mm wide at its back, comes to a point at its front
+        verts = np.array([
+            (0, 0, 0), (20, 2, 0), (0, 4, 0), (0, 0, 3), (20, 2, 3), (0, 4, 3)
+        ], dtype=np.float64)
+        tris = np.array([(0, 2, 1), (3, 4, 5), (0, 1, 4), (0, 4, 3), (1, 2, 5), (1, 5, 4), (2, 0, 3), (2, 3, 5)])
+        self.assertGreater(validation.min_wall_thickness(verts, tris), 0.8)
+
+    def test_split_vertices_are_welded(self):
+        # every face with its own vertices, like the caps and sides of a text mesh
+        verts, tris = box((0, 0, 0), (10, 6, 3))
+        split = verts[tris.ravel()]
+        report = validation.validate_parts({'model': ('model', split, np.arange(len(split)).reshape(-1, 3))})
+        self.assertEqual(report['parts']['model']['open_edges'], 0)
+        self.assertTrue(report['passed'])
+
+    def test_watertight_box_passes(self):
+        verts, tris = box((0, 0, 0), (10, 6, 3))
+        report = validation.check_part(verts, tris, dict(validation.DEFAULTS))
+        self.assertEqual(report['problems'], [])
+        self.assertAlmostEqual(report['min_thickness'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import bpy
+import json
+import os
+import sys
+import time
+import traceback
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from make_model import make_model  # noqa: E402
+from make_holder import make_holder  # noqa: E402
+from batch_utils import make_spool, write_json, reset_scene  # noqa: E402
+
+def running_name(worker_id, job_file):
+    return '{0}__{1}'.format(worker_id, job_file)
+
+
+def claim_job(spool, worker_id):
+    '''Move the oldest pending job into `running`, returns its file name (or None if there are no jobs)'''
+    pending = os.path.join(spool, 'pending')
+    for job_file in sorted(os.listdir(pending)):
+        if not job_file.endswith('.json'):
+            continue
+        try:
+            # renames are atomic so only one worker can claim each job
+            os.rename(
+                os.path.join(pending, job_file),
+                os.path.join(spool, 'running', running_name(worker_id, job_file))
+            )
+        except OSError:
+            continue
+        return job_file
+    return None
+
+
+def run_job(config):
+    # jobs use the same config files as make_model.py and make_holder.py
+    if 'input_file_path' in config:
+        return make_model(config)
+    return make_holder(config)
+
+
+def serve(spool, worker_id, poll_interval=0.5, max_jobs=0):
+    '''Run jobs from the spool folder until a `stop` file is made in it (or `max_jobs` have been run)'''
+    make_spool(spool)
+    startup_file = bpy.data.filepath
+    n_jobs = 0
+    while not os.path.exists(os.path.join(spool, 'stop')):
+        job_file = claim_job(spool, worker_id)
+        if job_file is None:
+            time.sleep(poll_interval)
+            continue
+        running_path = os.path.join(spool, 'running', running_name(worker_id, job_file))
+        job = os.path.splitext(job_file)[0]
+        print('worker {0}: started {1}'.format(worker_id, job), flush=True)
+        start = time.perf_counter()
+        result = {'job': job, 'worker': worker_id}
+        try:
+            with open(running_path) as config_file:
+                config = json.load(config_file)
+            reset_scene(startup_file)
+            result.update(run_job(config))
+            result['status'] = 'done'
+        except Exception:
+            result['status'] = 'error'
+            result['error'] = traceback.format_exc()
+        result['time'] = time.perf_counter() - start
+        write_json(os.path.join(spool, 'done', job_file), result)
+        os.remove(running_path)
+        print('worker {0}: {1} {2} in {3:.1f}s'.format(worker_id, result['status'], job, result['time']), flush=True)
+        n_jobs += 1
+        if (max_jobs > 0) and (n_jobs >= max_jobs):
+            break
+
+
+if __name__ == '__main__':
+    import argparse
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    parser = argparse.ArgumentParser(
+        prog='blender TU_startup.blend --python worker.py --',
+        description='Run model and holder jobs from a spool folder in a long running Blender'
+    )
+    parser.add_argument(
+        'spool',
+        type=str,
+        help='the spool folder, jobs are read from `pending` and the results written to `done`'
+    )
+    parser.add_argument(
+        '--id',
+        type=str,
+        default='0',
+        help='name of this worker'
+    )
+    parser.add_argument(
+        '--poll',
+        type=float,
+        default=0.5,
+        help='how often (in seconds) to look for new jobs'
+    )
+    parser.add_argument(
+        '--max-jobs',
+        type=int,
+        default=0,
+        help='exit after this many jobs (0 for no limit), the supervisor starts a fresh worker'
+    )
+    args = parser.parse_args(argv)
+    serve(args.spool, args.id, poll_interval=args.poll, max_jobs=args.max_jobs)
+    bpy.ops.wm.quit_blender()
@@ -0,0 +1,150 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+import uuid
+from batch_utils import make_spool, write_json
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'worker.py')
+# a job that takes down this many workers is failed instead of run again
+MAX_ATTEMPTS = 2
+
+
+def requeue(spool, worker_id, attempts):
+    '''Put the jobs a dead worker was running back in `pending` (or fail them if they keep killing workers)'''
+    running = os.path.join(spool, 'running')
+    prefix = '{0}__'.format(worker_id)
+    for running_file in os.listdir(running):
+        if (worker_id is not None) and (not running_file.startswith(prefix)):
+            continue
+        job_file = running_file.split('__', 1)[1]
+        attempts[job_file] = attempts.get(job_file, 0) + 1
+        if attempts[job_file] >= MAX_ATTEMPTS:
+            write_json(os.path.join(spool, 'done', job_file), {
+                'job': os.path.splitext(job_file)[0],
+                'worker': running_file.split('__', 1)[0],
+                'status': 'error',
+                'error': 'The worker exited while running the job {0} times'.format(attempts[job_file])
+            })
+            os.remove(os.path.join(running, running_file))
+        else:
+            os.rename(os.path.join(running, running_file), os.path.join(spool, 'pending', job_file))
+
+
+def start_worker(spool, worker_id, blender, blend_file, max_jobs, background):
+    command = [blender, blend_file]
+    if background:
+        command.append('-b')
+    command += [
+        '--python-exit-code', '1',
+        '--python', WORKER_SCRIPT,
+        '--',
+        spool,
+        '--id', worker_id,
+        '--max-jobs', str(max_jobs)
+    ]
+    return subprocess.Popen(command)
+
+
+def serve(spool, n_workers=1, blender='blender', blend_file='TU_startup.blend', max_jobs=0, background=True):
+    '''Keep `n_workers` Blender workers running on the spool folder, restarting any that exit'''
+    make_spool(spool)
+    stop_file = os.path.join(spool, 'stop')
+    if os.path.exists(stop_file):
+        os.remove(stop_file)
+    attempts = {}
+    # jobs left running by an earlier pool
+    requeue(spool, None, attempts)
+    worker_ids = [str(i) for i in range(n_workers)]
+    workers = {i: start_worker(spool, i, blender, blend_file, max_jobs, background) for i in worker_ids}
+    try:
+        while not os.path.exists(stop_file):
+            time.sleep(1)
+            for worker_id, worker in workers.items():
+                if worker.poll() is not None:
+                    requeue(spool, worker_id, attempts)
+                    print('worker {0} exited ({1}), restarting'.format(worker_id, worker.returncode), flush=True)
+                    workers[worker_id] = start_worker(spool, worker_id, blender, blend_file, max_jobs, background)
+    except KeyboardInterrupt:
+        stop(spool)
+    # the workers finish their current job before exiting
+    for worker in workers.values():
+        worker.wait()
+    requeue(spool, None, attempts)
+
+
+def submit(spool, config_path, wait=False, poll_interval=0.5):
+    '''Add a job to the spool folder, returns the job name (and its result if `wait` is set)'''
+    make_spool(spool)
+    # jobs are run in order of their names
+    job = '{0}_{1}_{2}'.format(
+        time.strftime('%Y%m%dT%H%M%S'),
+        uuid.uuid4().hex[:6],
+        os.path.splitext(os.path.basename(config_path))[0]
+    )
+    job_file = '{0}.json'.format(job)
+    temp_path = os.path.join(spool, '{0}.tmp'.format(job_file))
+    shutil.copyfile(config_path, temp_path)
+    os.replace(temp_path, os.path.join(spool, 'pending', job_file))
+    if not wait:
+        return job, None
+    done_path = os.path.join(spool, 'done', job_file)
+    while not os.path.exists(done_path):
+        time.sleep(poll_interval)
+    with open(done_path) as result_file:
+        return job, json.load(result_file)
+
+
+def stop(spool):
+    open(os.path.join(spool, 'stop'), 'w').close()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Run a pool of long running Blender workers for model and holder jobs'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    serve_parser = subparsers.add_parser('serve', help='start the workers')
+    serve_parser.add_argument('spool', type=str, help='the spool folder')
+    serve_parser.add_argument('-n', '--workers', type=int, default=1, help='the number of workers')
+    serve_parser.add_argument('--blender', type=str, default='blender', help='the Blender executable')
+    serve_parser.add_argument('--blend', type=str, default='TU_startup.blend', help='the `.blend` file each job starts from')
+    serve_parser.add_argument(
+        '--max-jobs',
+        type=int,
+        default=0,
+        help='restart each worker after this many jobs (0 for no limit)'
+    )
+    serve_parser.add_argument(
+        '--window',
+        dest='background',
+        action='store_false',
+        help='run Blender with a window (the workers run in the background with `-b` by default)'
+    )
+    submit_parser = subparsers.add_parser('submit', help='add a job')
+    submit_parser.add_argument('spool', type=str, help='the spool folder')
+    submit_parser.add_argument('config', type=str, help='a make_model.py or make_holder.py config file')
+    submit_parser.add_argument('-w', '--wait', action='store_true', help='wait for the job and print the result')
+    stop_parser = subparsers.add_parser('stop', help='stop the workers once their current jobs finish')
+    stop_parser.add_argument('spool', type=str, help='the spool folder')
+    args = parser.parse_args()
+    if args.command == 'serve':
+        serve(
+            args.spool,
+            n_workers=args.workers,
+            blender=args.blender,
+            blend_file=args.blend,
+            max_jobs=args.max_jobs,
+            background=args.background
+        )
+    elif args.command == 'submit':
+        job, result = submit(args.spool, args.config, wait=args.wait)
+        print(job)
+        if result is not None:
+            print(json.dumps(result, indent=2))
+            sys.exit(0 if result['status'] == 'done' else 1)
+    else:
+        stop(args.spool)